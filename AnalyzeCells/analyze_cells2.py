@@ -1,16 +1,27 @@
 import argparse
+import asyncio
+import hashlib
 import json
+import shutil
 import tempfile
 import zipfile
 from dataclasses import dataclass
-from datetime import datetime, time, timedelta
+from datetime import datetime, timedelta, timezone
 from pathlib import Path
-from typing import Optional, Hashable
+from typing import Iterator, Optional
+from urllib.parse import parse_qs, urlsplit
 
+import numpy as np
 import pandas as pd
 from matplotlib import pyplot as plt
 from matplotlib.dates import DateFormatter
 
+# orjson is optional, but parses the json column of user-cells.csv multiple times faster
+try:
+    from orjson import loads as json_loads
+except ImportError:
+    from json import loads as json_loads
+
 
 def extract_cells2(cells2_file: Path, destination: Path):
     # Only extract files that are required for analysis from ZIP archive
@@ -56,9 +67,14 @@ def load_info(extracted_cells2: Path) -> DeviceJSON:
         return DeviceJSON.from_json(json.load(read_file))
 
 
-def process_info(dirs: list[Path]):
-    info_series = pd.Series([load_info(d).simple_string() for d in dirs])
+def summarize_info(infos: list[DeviceJSON]) -> dict[str, int]:
+    info_series = pd.Series([info.simple_string() for info in infos], dtype=str)
     device_count: pd.Series = info_series.to_frame(name='device').groupby(['device'])['device'].count()
+    return {str(device): int(count) for device, count in device_count.items()}
+
+
+def process_info(dirs: list[Path]):
+    device_count = summarize_info([load_info(d) for d in dirs])
 
     print('Dataset(s) from:')
     for device, count in device_count.items():
@@ -74,12 +90,22 @@ def filter_start_end(df: pd.DataFrame, start: Optional[datetime], end: Optional[
     return df
 
 
-def process_als_cells(dirs: list[Path]) -> int:
+def optional_float(value) -> Optional[float]:
+    return None if pd.isna(value) else float(value)
+
+
+def load_als_cells(dirs: list[Path]) -> pd.DataFrame:
     dfs = [pd.read_csv(d.joinpath('als-cells.csv')) for d in dirs]
-    df = pd.concat(dfs)
-    df.drop_duplicates(subset=['technology', 'country', 'network', 'area', 'cell'], inplace=True)
+    return pd.concat(dfs)
+
+
+def summarize_als_cells(df: pd.DataFrame) -> dict:
+    unique_df = df.drop_duplicates(subset=['technology', 'country', 'network', 'area', 'cell'])
+    return {'count': len(unique_df.index)}
 
-    als_cell_count = len(df.index)
+
+def process_als_cells(dirs: list[Path]) -> int:
+    als_cell_count = summarize_als_cells(load_als_cells(dirs))['count']
 
     print('ALS Cell Cache:')
     print(f'  Count: {als_cell_count}')
@@ -88,53 +114,895 @@ def process_als_cells(dirs: list[Path]) -> int:
     return als_cell_count
 
 
-def process_locations(dirs: list[Path], start: Optional[datetime], end: Optional[datetime]) -> int:
+def load_locations(dirs: list[Path], start: Optional[datetime], end: Optional[datetime]) -> pd.DataFrame:
     dfs = [pd.read_csv(d.joinpath('locations.csv')) for d in dirs]
-    df = filter_start_end(pd.concat(dfs), start, end)
+    return filter_start_end(pd.concat(dfs), start, end)
+
+
+def summarize_locations(df: pd.DataFrame) -> dict:
+    return {
+        'count': len(df.index),
+        'start': optional_float(df['collected'].min()),
+        'end': optional_float(df['collected'].max()),
+    }
 
-    location_count = len(df.index)
+
+def process_locations(df: pd.DataFrame) -> int:
+    summary = summarize_locations(df)
 
     print('Locations:')
-    print(f'  Count: {location_count}')
-    print(f'  Start: {datetime.fromtimestamp(df["collected"].min())}')
-    print(f'  End: {datetime.fromtimestamp(df["collected"].max())}')
+    print(f'  Count: {summary["count"]}')
+    print(f'  Start: {datetime.fromtimestamp(summary["start"])}')
+    print(f'  End: {datetime.fromtimestamp(summary["end"])}')
     print()
 
-    return location_count
+    return summary['count']
+
+
+TILE_MAX_ZOOM = 24
+SCORE_CATEGORIES = ['Untrusted', 'Suspicious', 'Trusted']
+
 
+def interleave_bits(x: np.ndarray, y: np.ndarray) -> np.ndarray:
+    """ Interleave the bits of two arrays of 32-bit integers into Morton codes, i.e., Z-order curve positions. """
+    codes = []
+    for value in (x, y):
+        value = value.astype(np.uint64) & np.uint64(0xFFFFFFFF)
+        for shift, mask in ((16, 0x0000FFFF0000FFFF), (8, 0x00FF00FF00FF00FF),
+                            (4, 0x0F0F0F0F0F0F0F0F), (2, 0x3333333333333333), (1, 0x5555555555555555)):
+            value = (value | (value << np.uint64(shift))) & np.uint64(mask)
+        codes.append(value)
+    return (codes[0] | (codes[1] << np.uint64(1))).astype(np.int64)
 
-def process_packets(dirs: list[Path], start: Optional[datetime], end: Optional[datetime]):
+
+def deinterleave_bits(codes: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """ Split Morton codes into their two 32-bit integer components. """
+    values = []
+    for offset in (0, 1):
+        value = (codes.astype(np.uint64) >> np.uint64(offset)) & np.uint64(0x5555555555555555)
+        for shift, mask in ((1, 0x3333333333333333), (2, 0x0F0F0F0F0F0F0F0F), (4, 0x00FF00FF00FF00FF),
+                            (8, 0x0000FFFF0000FFFF), (16, 0x00000000FFFFFFFF)):
+            value = (value | (value >> np.uint64(shift))) & np.uint64(mask)
+        values.append(value.astype(np.int64))
+    return values[0], values[1]
+
+
+def tile_coordinates(latitude: np.ndarray, longitude: np.ndarray, zoom: int) -> tuple[np.ndarray, np.ndarray]:
+    """ Quantise coordinates into the column and row of the equirectangular grid with 2^zoom tiles per axis. """
+    tiles = 1 << zoom
+    x = np.clip(np.floor((longitude + 180.0) / 360.0 * tiles), 0, tiles - 1).astype(np.int64)
+    y = np.clip(np.floor((latitude + 90.0) / 180.0 * tiles), 0, tiles - 1).astype(np.int64)
+    return x, y
+
+
+def tile_bounds(codes: np.ndarray, zoom: int) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """ Returns the south, west, north, and east bounds of the tiles. """
+    x, y = deinterleave_bits(codes)
+    lon_size, lat_size = 360.0 / (1 << zoom), 180.0 / (1 << zoom)
+    return y * lat_size - 90.0, x * lon_size - 180.0, (y + 1) * lat_size - 90.0, (x + 1) * lon_size - 180.0
+
+
+def score_category_codes(scores: np.ndarray) -> np.ndarray:
+    """ Vectorized variant of cell_score_category returning the index into SCORE_CATEGORIES. """
+    return np.digitize(scores, [50, 95])
+
+
+@dataclass
+class SpatialIndex:
+    """
+    Locations sorted by the Morton code of their tile at the maximum zoom level.
+    The tiles of a lower zoom level are prefixes of these codes, so every tile covers a contiguous range of the index.
+    """
+    codes: np.ndarray
+    collected: np.ndarray
+    latitude: np.ndarray
+    longitude: np.ndarray
+    accuracy: np.ndarray
+
+    @staticmethod
+    def from_locations(df: pd.DataFrame) -> 'SpatialIndex':
+        latitude = pd.to_numeric(df['latitude'], errors='coerce').to_numpy(dtype=np.float64)
+        longitude = pd.to_numeric(df['longitude'], errors='coerce').to_numpy(dtype=np.float64)
+        accuracy = pd.to_numeric(df['horizontalAccuracy'], errors='coerce').to_numpy(dtype=np.float64)
+        collected = df['collected'].to_numpy(dtype=np.float64)
+
+        valid = ~(np.isnan(latitude) | np.isnan(longitude))
+        latitude, longitude, accuracy, collected = latitude[valid], longitude[valid], accuracy[valid], collected[valid]
+
+        codes = interleave_bits(*tile_coordinates(latitude, longitude, TILE_MAX_ZOOM))
+        order = np.argsort(codes, kind='stable')
+        return SpatialIndex(codes[order], collected[order], latitude[order], longitude[order], accuracy[order])
+
+    def __len__(self):
+        return len(self.codes)
+
+    def tile_codes(self, zoom: int) -> np.ndarray:
+        return self.codes >> (2 * (TILE_MAX_ZOOM - zoom))
+
+    def align_scores(self, user_cells_df: pd.DataFrame, tolerance: float) -> np.ndarray:
+        """
+        Assign each user cell measurement to the closest location fix in time (at most tolerance seconds apart).
+        Returns one row per aligned measurement with the position of the fix in the index and its score category.
+        """
+        cells = user_cells_df[['collected', 'verificationScore']].dropna().sort_values('collected')
+        if len(cells.index) == 0 or len(self) == 0:
+            return np.empty((0, 2), dtype=np.int64)
+
+        # Locations ordered by time, still referencing their position in the index
+        time_order = np.argsort(self.collected, kind='stable')
+        fixes = pd.DataFrame({'collected': self.collected[time_order], 'position': time_order})
+        aligned = pd.merge_asof(
+            cells, fixes, on='collected', direction='nearest', tolerance=tolerance
+        ).dropna(subset=['position'])
+
+        return np.column_stack([
+            aligned['position'].to_numpy(dtype=np.int64),
+            score_category_codes(aligned['verificationScore'].to_numpy())
+        ])
+
+    def tiles(self, zoom: int, aligned_scores: np.ndarray) -> pd.DataFrame:
+        """ Aggregate the number of fixes, their accuracy, and the aligned measurement categories per tile. """
+        codes = self.tile_codes(zoom)
+        if len(codes) == 0:
+            return pd.DataFrame(columns=['tile', 'count', 'accuracy', 'accuracyMax', *SCORE_CATEGORIES])
+
+        # The codes are sorted, so each tile starts where the code changes
+        starts = np.concatenate([[0], np.flatnonzero(np.diff(codes)) + 1])
+        counts = np.diff(np.append(starts, len(codes)))
+
+        accuracy = np.nan_to_num(self.accuracy, nan=0.0)
+        has_accuracy = (~np.isnan(self.accuracy)).astype(np.int64)
+        accuracy_count = np.add.reduceat(has_accuracy, starts)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            accuracy_mean = np.add.reduceat(accuracy, starts) / accuracy_count
+        accuracy_max = np.maximum.reduceat(np.where(has_accuracy == 1, accuracy, -np.inf), starts)
+
+        tiles = pd.DataFrame({
+            'tile': codes[starts],
+            'count': counts,
+            'accuracy': accuracy_mean,
+            'accuracyMax': np.where(np.isinf(accuracy_max), np.nan, accuracy_max),
+        })
+
+        # Map every location to its tile and count the measurement categories with a single bincount
+        tile_of_position = np.repeat(np.arange(len(starts)), counts)
+        categories = np.zeros((len(starts), len(SCORE_CATEGORIES)), dtype=np.int64)
+        if len(aligned_scores) > 0:
+            flat = tile_of_position[aligned_scores[:, 0]] * len(SCORE_CATEGORIES) + aligned_scores[:, 1]
+            categories = np.bincount(flat, minlength=categories.size).reshape(categories.shape)
+        for i, category in enumerate(SCORE_CATEGORIES):
+            tiles[category] = categories[:, i]
+
+        return tiles
+
+    def query(self, south: float, west: float, north: float, east: float) -> np.ndarray:
+        """
+        Returns the index positions of all locations within the bounding box.
+        The box is covered with a limited number of tiles whose code ranges are looked up with a binary search,
+        so only the locations in these tiles have to be checked.
+        """
+        if len(self) == 0 or south > north or west > east:
+            return np.empty(0, dtype=np.int64)
+
+        # Choose the most detailed zoom level where the box spans at most 32 x 32 tiles
+        zoom = TILE_MAX_ZOOM
+        while zoom > 0:
+            (x0, x1), (y0, y1) = tile_coordinates(np.array([south, north]), np.array([west, east]), zoom)
+            if (x1 - x0 + 1) * (y1 - y0 + 1) <= 1024:
+                break
+            zoom -= 1
+        (x0, x1), (y0, y1) = tile_coordinates(np.array([south, north]), np.array([west, east]), zoom)
+
+        xs, ys = np.meshgrid(np.arange(x0, x1 + 1), np.arange(y0, y1 + 1))
+        tiles = np.sort(interleave_bits(xs.ravel(), ys.ravel()))
+
+        # Merge neighbouring tiles on the curve into a single range
+        range_starts = np.concatenate([[0], np.flatnonzero(np.diff(tiles) != 1) + 1])
+        range_ends = np.append(range_starts[1:], len(tiles)) - 1
+        shift = 2 * (TILE_MAX_ZOOM - zoom)
+        lower = self.codes.searchsorted(tiles[range_starts] << shift, side='left')
+        upper = self.codes.searchsorted((tiles[range_ends] + 1) << shift, side='left')
+
+        lengths = upper - lower
+        candidates = np.repeat(lower - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+        inside = (
+                (self.latitude[candidates] >= south) & (self.latitude[candidates] <= north) &
+                (self.longitude[candidates] >= west) & (self.longitude[candidates] <= east)
+        )
+        return candidates[inside]
+
+
+def tiles_geojson(tiles: dict[int, pd.DataFrame]) -> dict:
+    """ Convert the tiles of multiple zoom levels into a GeoJSON feature collection of polygons. """
+    features = []
+    for zoom, df in tiles.items():
+        south, west, north, east = tile_bounds(df['tile'].to_numpy(dtype=np.int64), zoom)
+        for i, row in enumerate(df.itertuples(index=False)):
+            features.append({
+                'type': 'Feature',
+                'geometry': {
+                    'type': 'Polygon',
+                    'coordinates': [[
+                        [west[i], south[i]], [east[i], south[i]], [east[i], north[i]],
+                        [west[i], north[i]], [west[i], south[i]]
+                    ]],
+                },
+                'properties': {
+                    'zoom': zoom,
+                    'tile': int(row.tile),
+                    'count': int(row.count),
+                    'accuracy': optional_float(row.accuracy),
+                    'accuracyMax': optional_float(row.accuracyMax),
+                    **{category: int(getattr(row, category)) for category in SCORE_CATEGORIES},
+                },
+            })
+    return {'type': 'FeatureCollection', 'features': features}
+
+
+def process_location_tiles(
+        locations_df: pd.DataFrame, user_cells_df: pd.DataFrame, zooms: list[int], tolerance: float,
+        geojson_path: Optional[Path], bbox: Optional[list[float]]
+):
+    index = SpatialIndex.from_locations(locations_df)
+    aligned_scores = index.align_scores(user_cells_df, tolerance)
+
+    print('Location Tiles:')
+    print(f'  Locations: {len(index)}')
+    print(f'  Aligned Measurements: {len(aligned_scores)} (within {tolerance:g}s)')
+
+    tiles: dict[int, pd.DataFrame] = {}
+    for zoom in zooms:
+        df = index.tiles(zoom, aligned_scores)
+        tiles[zoom] = df
+        tile_size = 360.0 / (1 << zoom)
+        print(f'  Zoom {zoom} ({tile_size:.4g}° x {tile_size / 2:.4g}°): {len(df.index)} tiles')
+        if len(df.index) == 0:
+            continue
+
+        densest = df.loc[df['count'].idxmax()]
+        south, west, north, east = (b[0] for b in tile_bounds(np.array([densest['tile']], dtype=np.int64), zoom))
+        print(f'    Densest: {int(densest["count"])} fixes at {(south + north) / 2:.5f}, {(west + east) / 2:.5f}')
+        suspicious = df[(df['Untrusted'] + df['Suspicious']) > 0]
+        print(f'    With Untrusted or Suspicious Measurements: {len(suspicious.index)}')
+
+    if bbox:
+        south, west, north, east = bbox
+        positions = index.query(south, west, north, east)
+        print(f'  Bounding Box ({south}, {west}, {north}, {east}): {len(positions)} locations')
+        if len(positions) > 0:
+            in_box = np.zeros(len(index), dtype=bool)
+            in_box[positions] = True
+            box_scores = aligned_scores[in_box[aligned_scores[:, 0]]] if len(aligned_scores) > 0 else aligned_scores
+            box_counts = np.bincount(box_scores[:, 1], minlength=len(SCORE_CATEGORIES)) if len(box_scores) > 0 \
+                else np.zeros(len(SCORE_CATEGORIES), dtype=np.int64)
+            print('    Measurements: ' + ', '.join(
+                f'{category} ({count})' for category, count in zip(SCORE_CATEGORIES, box_counts)
+            ))
+
+    if geojson_path:
+        with open(geojson_path, 'w') as file:
+            json.dump(tiles_geojson(tiles), file)
+        print(f'  GeoJSON: {geojson_path}')
+
+    print()
+
+
+def load_packets(dirs: list[Path], start: Optional[datetime], end: Optional[datetime]) -> pd.DataFrame:
     dfs = [pd.read_csv(d.joinpath('packets.csv'), usecols=['collected', 'direction', 'proto']) for d in dirs]
-    df = filter_start_end(pd.concat(dfs), start, end)
+    return filter_start_end(pd.concat(dfs), start, end)
 
-    packet_count = len(df.index)
 
+def summarize_packets(df: pd.DataFrame) -> dict:
     proto_series: pd.Series = df.groupby(['proto'])['proto'].count()
-    proto_string = ', '.join([f'{proto} ({count})' for proto, count in proto_series.items()])
+    return {
+        'count': len(df.index),
+        'proto': {str(proto): int(count) for proto, count in proto_series.items()},
+        'start': optional_float(df['collected'].min()),
+        'end': optional_float(df['collected'].max()),
+    }
+
+
+def process_packets(summary: dict):
+    proto_string = ', '.join([f'{proto} ({count})' for proto, count in summary['proto'].items()])
 
     print('Packets:')
     print(f'  Proto: {proto_string}')
-    print(f'  Count: {packet_count}')
-    print(f'  Start: {datetime.fromtimestamp(df["collected"].min())}')
-    print(f'  End: {datetime.fromtimestamp(df["collected"].max())}')
+    print(f'  Count: {summary["count"]}')
+    print(f'  Start: {datetime.fromtimestamp(summary["start"])}')
+    print(f'  End: {datetime.fromtimestamp(summary["end"])}')
+    print()
+
+    return summary['count']
+
+
+class PacketOrderError(ValueError):
+    pass
+
+
+class PacketRateProfile:
+    """
+    Streaming profile of the packet rate per protocol, direction, and SIM slot.
+    Each chunk is processed with vectorized operations and only a fixed amount of state is kept per group:
+    the last packet and its (still open) time bin, a logarithmic histogram of the inter-packet intervals, as well as
+    the time bins above the burst threshold and the silent gaps.
+    Packets only have to be ordered by time across chunk boundaries, otherwise add raises a PacketOrderError.
+    CellGuard does not guarantee this order, e.g., packets imported from sysdiagnoses are exported after newer ones.
+    """
+
+    # 20 logarithmic bins per decade from 1µs to ~115 days for approximate interval percentiles
+    INTERVAL_EDGES = np.logspace(-6, 7, 13 * 20 + 1)
+
+    def __init__(self, resolution: float, burst_threshold: int, gap_threshold: float):
+        self.resolution = resolution
+        self.burst_threshold = burst_threshold
+        self.gap_threshold = gap_threshold
+
+        self.keys: list[tuple[str, str, Optional[int]]] = []
+        self.key_ids: dict[tuple[str, str, Optional[int]], int] = {}
+        self.counts = np.zeros(0, dtype=np.int64)
+        self.first = np.zeros(0)
+        self.latest = np.zeros(0)
+        self.last = np.zeros(0)
+        self.open_bin = np.zeros(0, dtype=np.int64)
+        self.open_count = np.zeros(0, dtype=np.int64)
+        self.active_bins = np.zeros(0, dtype=np.int64)
+        self.peak = np.zeros(0, dtype=np.int64)
+        self.intervals = np.zeros((0, len(self.INTERVAL_EDGES) + 1), dtype=np.int64)
+        self.interval_max = np.zeros(0)
+
+        # Lists of arrays per chunk: group, bin, and count of bursts, as well as group, start, and duration of gaps
+        self.bursts: list[tuple[np.ndarray, np.ndarray, np.ndarray]] = []
+        self.gaps: list[tuple[np.ndarray, np.ndarray, np.ndarray]] = []
+        # Names of the files whose packets had to be sorted
+        self.sorted_files: list[str] = []
+
+    def group_ids(self, df: pd.DataFrame) -> np.ndarray:
+        # Factorizing each column and only converting their unique values is much faster than a combined key
+        sim_slots = df['simSlot'] if 'simSlot' in df else pd.Series(np.nan, df.index)
+        columns = [pd.factorize(column, use_na_sentinel=False) for column in (df['proto'], df['direction'], sim_slots)]
+        (proto_codes, protos), (direction_codes, directions), (sim_slot_codes, sim_slot_values) = columns
+        sim_slot_values = pd.to_numeric(pd.Series(sim_slot_values, dtype=object), errors='coerce')
+
+        # Only register the combinations which occur in the chunk
+        combined = (proto_codes * len(directions) + direction_codes) * len(sim_slot_values) + sim_slot_codes
+        combinations, inverse = np.unique(combined, return_inverse=True)
+        mapping = np.empty(len(combinations), dtype=np.int64)
+        for i, combination in enumerate(combinations):
+            proto_direction, k = divmod(int(combination), len(sim_slot_values))
+            p, j = divmod(proto_direction, len(directions))
+            sim_slot = sim_slot_values.iloc[k]
+            key = (str(protos[p]), str(directions[j]), None if pd.isna(sim_slot) else int(sim_slot))
+            if key not in self.key_ids:
+                self.key_ids[key] = len(self.keys)
+                self.keys.append(key)
+            mapping[i] = self.key_ids[key]
+
+        self.grow()
+        return mapping[inverse]
+
+    def grow(self):
+        """ Add the initial per-group state for newly registered groups. """
+        new = len(self.keys) - len(self.counts)
+        if new <= 0:
+            return
+        self.counts = np.append(self.counts, np.zeros(new, dtype=np.int64))
+        self.first = np.append(self.first, np.full(new, np.inf))
+        self.latest = np.append(self.latest, np.full(new, -np.inf))
+        self.last = np.append(self.last, np.full(new, np.nan))
+        self.open_bin = np.append(self.open_bin, np.zeros(new, dtype=np.int64))
+        self.open_count = np.append(self.open_count, np.zeros(new, dtype=np.int64))
+        self.active_bins = np.append(self.active_bins, np.zeros(new, dtype=np.int64))
+        self.peak = np.append(self.peak, np.zeros(new, dtype=np.int64))
+        self.intervals = np.vstack([self.intervals, np.zeros((new, self.intervals.shape[1]), dtype=np.int64)])
+        self.interval_max = np.append(self.interval_max, np.zeros(new))
+
+    STATE_ARRAYS = [
+        'counts', 'first', 'latest', 'last', 'open_bin', 'open_count', 'active_bins', 'peak', 'intervals', 'interval_max'
+    ]
+
+    def checkpoint(self) -> dict:
+        state: dict = {name: getattr(self, name).copy() for name in self.STATE_ARRAYS}
+        state['bursts'] = len(self.bursts)
+        state['gaps'] = len(self.gaps)
+        return state
+
+    def restore(self, state: dict):
+        """ Reset to a checkpoint, groups registered in the meantime are kept with their initial state. """
+        for name in self.STATE_ARRAYS:
+            setattr(self, name, state[name].copy())
+        del self.bursts[state['bursts']:]
+        del self.gaps[state['gaps']:]
+        self.grow()
+
+    def close_bins(self, groups: np.ndarray, bins: np.ndarray, counts: np.ndarray):
+        np.add.at(self.active_bins, groups, 1)
+        np.maximum.at(self.peak, groups, counts)
+        bursts = counts >= self.burst_threshold
+        if bursts.any():
+            self.bursts.append((groups[bursts], bins[bursts], counts[bursts]))
+
+    def add(self, df: pd.DataFrame):
+        if len(df.index) == 0:
+            return
+        self.add_packets(self.group_ids(df), df['collected'].to_numpy(dtype=np.float64))
+
+    def add_packets(self, groups: np.ndarray, collected: np.ndarray):
+        """ Add packets given by their group IDs and collection timestamps. """
+        if len(groups) == 0:
+            return
+
+        # The state of a group is only valid if no packet precedes its last packet from the previous chunk
+        if (collected < self.last[groups]).any():
+            raise PacketOrderError('Packets are not ordered by time across chunks')
+
+        np.add.at(self.counts, groups, 1)
+        np.minimum.at(self.first, groups, collected)
+        np.maximum.at(self.latest, groups, collected)
+
+        # Continue with the last packet of each group from the previous chunk, weighted with the count of its open bin
+        carried = np.flatnonzero(~np.isnan(self.last))
+        groups = np.concatenate([carried, groups])
+        collected = np.concatenate([self.last[carried], collected])
+        weights = np.concatenate([self.open_count[carried], np.ones(len(collected) - len(carried), dtype=np.int64)])
+        is_carried = np.concatenate([np.ones(len(carried), dtype=bool), np.zeros(len(collected) - len(carried), bool)])
+
+        order = np.lexsort((~is_carried, collected, groups))
+        groups, collected, weights = groups[order], collected[order], weights[order]
+
+        group_start = np.ones(len(groups), dtype=bool)
+        group_start[1:] = groups[1:] != groups[:-1]
+        group_end = np.append(group_start[1:], True)
+
+        # Inter-packet intervals within each group
+        within = ~group_start[1:]
+        interval_groups = groups[1:][within]
+        intervals = np.diff(collected)[within]
+        interval_bins = np.searchsorted(self.INTERVAL_EDGES, intervals, side='right')
+        self.intervals += np.bincount(
+            interval_groups * self.intervals.shape[1] + interval_bins, minlength=self.intervals.size
+        ).reshape(self.intervals.shape)
+        np.maximum.at(self.interval_max, interval_groups, intervals)
+
+        gaps = intervals > self.gap_threshold
+        if gaps.any():
+            self.gaps.append((interval_groups[gaps], collected[:-1][within][gaps], intervals[gaps]))
+
+        # Packets per time bin, the last bin of each group stays open as the next chunk may add to it
+        bins = np.floor(collected / self.resolution).astype(np.int64)
+        run_start = group_start.copy()
+        run_start[1:] |= bins[1:] != bins[:-1]
+        starts = np.flatnonzero(run_start)
+        run_counts = np.add.reduceat(weights, starts)
+        run_groups, run_bins = groups[starts], bins[starts]
+        run_open = group_end[np.append(starts[1:], len(groups)) - 1]
+
+        self.close_bins(run_groups[~run_open], run_bins[~run_open], run_counts[~run_open])
+        self.open_bin[run_groups[run_open]] = run_bins[run_open]
+        self.open_count[run_groups[run_open]] = run_counts[run_open]
+        self.last[groups[group_end]] = collected[group_end]
+
+    def finish(self):
+        """ Close the open bins at the end of a file, so the next file starts without any preceding packet. """
+        carried = np.flatnonzero(~np.isnan(self.last))
+        self.close_bins(carried, self.open_bin[carried], self.open_count[carried])
+        self.last[carried] = np.nan
+        self.open_count[carried] = 0
+
+    def summarize(self) -> dict:
+        """ Returns the same summary as summarize_packets. """
+        observed = np.flatnonzero(self.counts > 0)
+        proto_counts: dict[str, int] = {}
+        for group in observed:
+            proto = self.keys[group][0]
+            proto_counts[proto] = proto_counts.get(proto, 0) + int(self.counts[group])
+        return {
+            'count': int(self.counts.sum()),
+            'proto': dict(sorted(proto_counts.items())),
+            'start': float(self.first[observed].min()) if len(observed) > 0 else None,
+            'end': float(self.latest[observed].max()) if len(observed) > 0 else None,
+        }
+
+    def interval_percentiles(self, group: int, percentiles: list[float]) -> list[Optional[float]]:
+        """ Approximates percentiles of the inter-packet intervals with the upper edge of their histogram bin. """
+        histogram = self.intervals[group]
+        total = histogram.sum()
+        if total == 0:
+            return [None for _ in percentiles]
+        positions = np.searchsorted(np.cumsum(histogram), np.ceil(np.array(percentiles) / 100 * total), side='left')
+        edges = np.append(self.INTERVAL_EDGES, np.inf)
+        return [float(min(edges[position], self.interval_max[group])) for position in positions]
+
+    def periods(self, group: int) -> list[tuple[float, float, int, int]]:
+        """ Merge consecutive burst bins of a group into periods of start, end, packets, and peak bin. """
+        if not self.bursts:
+            return []
+        groups, bins, counts = (np.concatenate(arrays) for arrays in zip(*self.bursts))
+        selected = groups == group
+        bins, counts = bins[selected], counts[selected]
+        if len(bins) == 0:
+            return []
+
+        order = np.argsort(bins, kind='stable')
+        bins, counts = bins[order], counts[order]
+        starts = np.flatnonzero(np.append(True, np.diff(bins) != 1))
+        ends = np.append(starts[1:], len(bins)) - 1
+        packets = np.add.reduceat(counts, starts)
+        peaks = np.maximum.reduceat(counts, starts)
+        return [
+            (bins[start] * self.resolution, (bins[end] + 1) * self.resolution, int(packet_count), int(peak))
+            for start, end, packet_count, peak in zip(starts, ends, packets, peaks)
+        ]
+
+    def silent_gaps(self, group: int) -> tuple[np.ndarray, np.ndarray]:
+        if not self.gaps:
+            return np.zeros(0), np.zeros(0)
+        groups, starts, durations = (np.concatenate(arrays) for arrays in zip(*self.gaps))
+        selected = groups == group
+        return starts[selected], durations[selected]
+
+
+def format_key(key: tuple[str, str, Optional[int]]) -> str:
+    proto, direction, sim_slot = key
+    return f'{proto} {direction} (SIM {sim_slot if sim_slot is not None else "?"})'
+
+
+def merge_sorted_runs(
+        runs: list[tuple[np.ndarray, np.ndarray]], chunksize: int
+) -> Iterator[tuple[np.ndarray, np.ndarray]]:
+    """
+    Merge runs of group IDs and timestamps, each sorted by time, into chunks sorted by time.
+    Only a block of each run is read at once, so memory-mapped runs are never loaded completely.
+    """
+    block = max(chunksize // max(len(runs), 1), 1)
+    positions = [0 for _ in runs]
+    pending_groups = np.empty(0, dtype=np.int64)
+    pending_collected = np.empty(0)
+    threshold = -np.inf
+
+    while True:
+        # Continue reading all runs whose loaded packets have been emitted completely
+        loaded_groups, loaded_collected = [pending_groups], [pending_collected]
+        for i, (groups, collected) in enumerate(runs):
+            if positions[i] < len(collected) and (positions[i] == 0 or collected[positions[i] - 1] <= threshold):
+                loaded_groups.append(np.asarray(groups[positions[i]:positions[i] + block]))
+                loaded_collected.append(np.asarray(collected[positions[i]:positions[i] + block]))
+                positions[i] += block
+
+        # Packets up to the last loaded packet of any unfinished run precede all packets which are not yet loaded
+        unfinished = [
+            collected[positions[i] - 1] for i, (_, collected) in enumerate(runs) if positions[i] < len(collected)
+        ]
+        threshold = min(unfinished) if unfinished else np.inf
+
+        pending_groups, pending_collected = np.concatenate(loaded_groups), np.concatenate(loaded_collected)
+        order = np.argsort(pending_collected, kind='stable')
+        pending_groups, pending_collected = pending_groups[order], pending_collected[order]
+        ready = np.searchsorted(pending_collected, threshold, side='right')
+        if ready > 0:
+            yield pending_groups[:ready], pending_collected[:ready]
+            pending_groups, pending_collected = pending_groups[ready:], pending_collected[ready:]
+
+        if not unfinished:
+            return
+
+
+def profile_packet_rates(
+        dirs: list[Path], start: Optional[datetime], end: Optional[datetime],
+        resolution: float, burst_threshold: int, gap_threshold: float, chunksize: int
+) -> PacketRateProfile:
+    profile = PacketRateProfile(resolution, burst_threshold, gap_threshold)
+    columns = ['collected', 'direction', 'simSlot', 'proto']
+    for d in dirs:
+        path = d.joinpath('packets.csv')
+        state = profile.checkpoint()
+        try:
+            for chunk in pd.read_csv(path, usecols=lambda x: x in columns, chunksize=chunksize):
+                profile.add(filter_start_end(chunk, start, end))
+        except PacketOrderError:
+            # Sort the packets with an external merge sort: each chunk is sorted and stored as a run on disk,
+            # afterward all runs are merged, so the memory usage is still bounded by the chunk size
+            profile.restore(state)
+            profile.sorted_files.append(d.name)
+            with tempfile.TemporaryDirectory() as run_dir:
+                runs: list[tuple[np.ndarray, np.ndarray]] = []
+                for i, chunk in enumerate(pd.read_csv(path, usecols=lambda x: x in columns, chunksize=chunksize)):
+                    chunk = filter_start_end(chunk, start, end)
+                    if len(chunk.index) == 0:
+                        continue
+                    groups = profile.group_ids(chunk)
+                    collected = chunk['collected'].to_numpy(dtype=np.float64)
+                    order = np.argsort(collected, kind='stable')
+                    groups_path, collected_path = Path(run_dir, f'{i}-groups.npy'), Path(run_dir, f'{i}-collected.npy')
+                    np.save(groups_path, groups[order])
+                    np.save(collected_path, collected[order])
+                    runs.append((np.load(groups_path, mmap_mode='r'), np.load(collected_path, mmap_mode='r')))
+
+                for groups, collected in merge_sorted_runs(runs, chunksize):
+                    profile.add_packets(groups, collected)
+                # Release the memory-mapped files before the directory is removed
+                runs.clear()
+        profile.finish()
+
+    return profile
+
+
+def process_packet_rates(profile: PacketRateProfile):
+    burst_threshold, gap_threshold = profile.burst_threshold, profile.gap_threshold
+    groups = [group for group in range(len(profile.keys)) if profile.counts[group] > 0]
+
+    print(f'Packet Rates ({profile.resolution:g}s bins):')
+    if profile.sorted_files:
+        print(f'  Sorted on disk as not ordered by time: {", ".join(profile.sorted_files)}')
+    if not groups:
+        print('  None')
+    for group in sorted(groups, key=lambda i: format_key(profile.keys[i])):
+        count = int(profile.counts[group])
+        active_bins = int(profile.active_bins[group])
+        print(f'  {format_key(profile.keys[group])}: {count} packets')
+        print(f'    Rate: Mean {count / active_bins:.2f}, Peak {profile.peak[group]} per active bin ({active_bins} bins)')
+
+        p50, p90, p99 = profile.interval_percentiles(group, [50, 90, 99])
+        if p50 is not None:
+            print(f'    Intervals: P50 <= {p50:.3g}s, P90 <= {p90:.3g}s, P99 <= {p99:.3g}s, '
+                  f'Max {profile.interval_max[group]:.3g}s')
+
+        periods = profile.periods(group)
+        print(f'    Bursts (>= {burst_threshold} per bin): {len(periods)}')
+        if periods:
+            period_start, period_end, packets, peak = max(periods, key=lambda period: period[2])
+            print(f'      Largest: {packets} packets in {period_end - period_start:g}s '
+                  f'from {datetime.fromtimestamp(period_start)} (peak {peak})')
+
+        gap_starts, gap_durations = profile.silent_gaps(group)
+        print(f'    Silent Gaps (> {gap_threshold:g}s): {len(gap_durations)}')
+        if len(gap_durations) > 0:
+            longest = int(np.argmax(gap_durations))
+            print(f'      Longest: {timedelta(seconds=float(gap_durations[longest]))} '
+                  f'from {datetime.fromtimestamp(gap_starts[longest])}')
+            print(f'      Total: {timedelta(seconds=float(gap_durations.sum()))}')
     print()
 
-    return packet_count
 
+def cells2_digest(cells2_file: Path) -> str:
+    with cells2_file.open('rb') as f:
+        return hashlib.file_digest(f, 'sha256').hexdigest()
+
+
+def json_field(record: object, path: list[str]) -> object:
+    for key in path:
+        if not isinstance(record, dict):
+            return None
+        record = record.get(key)
+    return record
+
+
+def json_column(field: str) -> str:
+    """ Name of the column of an extracted field, prefixed to not collide with the columns of user-cells.csv. """
+    return f'json.{field}'
 
-def load_user_cells(dirs: list[Path], start: Optional[datetime], end: Optional[datetime]) -> pd.DataFrame:
+
+def json_cache_file(archive_cache_dir: Path, field: str) -> Path:
+    # The field is user input, so its hash is used as file name to stay within the cache directory
+    return archive_cache_dir.joinpath(hashlib.sha256(field.encode('utf-8')).hexdigest() + '.pkl')
+
+
+def extract_user_cells_json(
+        extracted_cells2: Path, digest: str, fields: list[str], cache_dir: Path, batch_size: int = 20_000
+) -> pd.DataFrame:
+    """
+    Extract the given fields (nested fields are separated by dots) from the json column of user-cells.csv.
+    The column is read in batches, so its strings are never kept in memory as a whole.
+    The resulting typed columns are cached per archive, as parsing is expensive.
+    """
+    archive_cache_dir = cache_dir.joinpath(digest)
+    columns: dict[str, pd.Series] = {}
+    missing_fields: list[str] = []
+
+    for field in fields:
+        cache_file = json_cache_file(archive_cache_dir, field)
+        if cache_file.is_file():
+            columns[field] = pd.read_pickle(cache_file)
+        else:
+            missing_fields.append(field)
+
+    if missing_fields:
+        paths = [field.split('.') for field in missing_fields]
+        values: list[list] = [[] for _ in missing_fields]
+
+        batches = pd.read_csv(
+            extracted_cells2.joinpath('user-cells.csv'), usecols=['json'], dtype={'json': str}, chunksize=batch_size
+        )
+        for batch in batches:
+            # Parsing one large JSON array is faster than parsing each string on its own
+            records = json_loads('[' + ','.join(batch['json'].fillna('null')) + ']')
+            for path, field_values in zip(paths, values):
+                field_values.extend([json_field(record, path) for record in records])
+
+        archive_cache_dir.mkdir(parents=True, exist_ok=True)
+        for field, field_values in zip(missing_fields, values):
+            column = pd.Series(field_values, name=json_column(field)).convert_dtypes()
+            if pd.api.types.is_string_dtype(column):
+                column = column.astype('category')
+            column.to_pickle(json_cache_file(archive_cache_dir, field))
+            columns[field] = column
+
+    return pd.DataFrame({json_column(field): columns[field] for field in fields})
+
+
+def load_user_cells(
+        dirs: list[Path], start: Optional[datetime], end: Optional[datetime],
+        json_fields: Optional[list[str]] = None, digests: Optional[list[str]] = None, cache_dir: Optional[Path] = None
+) -> pd.DataFrame:
     # https://stackoverflow.com/a/63002444/4106848
     columns = [
         'collected', 'verificationFinished', 'verificationScore',
         'technology', 'country', 'network', 'area', 'cell'
     ]
     dfs = [pd.read_csv(d.joinpath('user-cells.csv'), usecols=lambda x: x in columns) for d in dirs]
+    if json_fields:
+        # Both DataFrames are indexed by the row number in the CSV file
+        dfs = [
+            df.join(extract_user_cells_json(d, digest, json_fields, cache_dir))
+            for df, d, digest in zip(dfs, dirs, digests)
+        ]
     df = filter_start_end(pd.concat(dfs), start, end)
 
     # Only consider cells whose verification is complete
     return df[df['verificationFinished'] == True]
 
 
+def load_sysdiagnose_rows(dirs: list[Path], file_name: str) -> Optional[pd.DataFrame]:
+    """ Load the collected timestamps and the sysdiagnose identifiers as categorical column of a CSV file. """
+    dfs = []
+    for d in dirs:
+        path = d.joinpath(file_name)
+        if not path.is_file():
+            continue
+        df = pd.read_csv(
+            path, usecols=lambda x: x in ['collected', 'sysdiagnoseIdentifier'],
+            dtype={'sysdiagnoseIdentifier': 'category'}, keep_default_na=False, na_values={'collected': ['nil']}
+        )
+        if 'sysdiagnoseIdentifier' not in df:
+            return None
+        dfs.append(df)
+
+    if not dfs:
+        return None
+    df = pd.concat(dfs, ignore_index=True)
+    # Concatenating categorical columns with different categories results in an object column
+    df['sysdiagnoseIdentifier'] = df['sysdiagnoseIdentifier'].astype('category')
+    return df
+
+
+def process_sysdiagnoses(
+        dirs: list[Path], start: Optional[datetime], end: Optional[datetime],
+        csv_path: Optional[Path] = None, listed: int = 10
+):
+    tables = {
+        'cells': ('user-cells.csv', 'cellCount'),
+        'packets': ('packets.csv', 'packetCount'),
+        'connectivityEvents': ('connectivity-events.csv', 'connectivityEventCount'),
+    }
+
+    sysdiagnose_paths = [d.joinpath('sysdiagnoses.csv') for d in dirs if d.joinpath('sysdiagnoses.csv').is_file()]
+    table_dfs = {name: load_sysdiagnose_rows(dirs, file_name) for name, (file_name, _) in tables.items()}
+    if not sysdiagnose_paths or any(df is None for df in table_dfs.values()):
+        print('Sysdiagnoses: Missing data, please re-export datasets with CellGuard >= 1.5')
+        print()
+        return
+
+    time_columns = ['endTimeRef', 'highVolumeTime', 'persistTime']
+    sysdiagnoses = pd.concat([
+        pd.read_csv(path, dtype={'archiveIdentifier': str}, na_values=['nil']) for path in sysdiagnose_paths
+    ], ignore_index=True)
+    for column in time_columns + [column for _, column in tables.values()]:
+        sysdiagnoses[column] = pd.to_numeric(sysdiagnoses[column], errors='coerce')
+    all_sysdiagnoses = sysdiagnoses.drop_duplicates(subset=['archiveIdentifier']).reset_index(drop=True)
+
+    # Sysdiagnoses are selected by the end of their log archive, their rows are joined regardless of time
+    in_window = filter_start_end(
+        all_sysdiagnoses['endTimeRef'].rename('collected').to_frame(), start, end
+    ).index.to_numpy()
+    sysdiagnoses = all_sysdiagnoses.loc[in_window].reset_index(drop=True)
+    sysdiagnose_count = len(sysdiagnoses.index)
+    # Map the row number in the table of all sysdiagnoses to the row number of the selected ones (or -1),
+    # the additional last element maps the code -1 of unknown identifiers to -1
+    window_codes = np.full(len(all_sysdiagnoses.index) + 1, -1)
+    window_codes[in_window] = np.arange(sysdiagnose_count)
+
+    # Map every identifier to the row number of its sysdiagnose, so the tables are joined on integer codes
+    identifiers = pd.Index(all_sysdiagnoses['archiveIdentifier'])
+    report = pd.DataFrame({'archiveIdentifier': sysdiagnoses['archiveIdentifier']})
+    first = np.full(sysdiagnose_count, np.inf)
+    last = np.full(sysdiagnose_count, -np.inf)
+    codes_list: list[np.ndarray] = []
+    collected_list: list[np.ndarray] = []
+
+    print('Sysdiagnoses:')
+    print(f'  Count: {sysdiagnose_count}')
+
+    for name, (_, count_column) in tables.items():
+        df = table_dfs[name]
+        column = df['sysdiagnoseIdentifier']
+        # Only the categories are compared as strings, the rows are remapped by their codes
+        category_codes = identifiers.get_indexer(column.cat.categories)
+        all_codes = np.where(column.cat.codes.to_numpy() >= 0, category_codes[column.cat.codes.to_numpy()], -1)
+        codes = window_codes[all_codes]
+        unassigned = column.isin(['', 'nil']).to_numpy() | column.isna().to_numpy()
+
+        collected = df['collected'].to_numpy(dtype=float)
+        matched = codes >= 0
+        outside = (all_codes >= 0) & ~matched
+        # Rows without a known sysdiagnose can only be selected by their own time
+        unknown = (all_codes < 0) & ~unassigned
+        rows_in_window = np.zeros(len(collected), dtype=bool)
+        rows_in_window[filter_start_end(df[['collected']].reset_index(drop=True), start, end).index] = True
+        report[f'{name}Actual'] = np.bincount(codes[matched], minlength=sysdiagnose_count)
+        report[f'{name}Claimed'] = sysdiagnoses[count_column].to_numpy()
+        np.minimum.at(first, codes[matched], collected[matched])
+        np.maximum.at(last, codes[matched], collected[matched])
+        codes_list.append(codes[matched])
+        collected_list.append(collected[matched])
+
+        claimed = report[f'{name}Claimed']
+        mismatches = (claimed.notna() & (claimed != report[f'{name}Actual'])).sum()
+        outside_text = f'{outside.sum()} from sysdiagnoses outside the time window, ' if start or end else ''
+        print(f'  {name[0].upper() + name[1:]}: '
+              f'{matched.sum()} from sysdiagnoses, {outside_text}'
+              f'{(unknown & rows_in_window).sum()} from unknown sysdiagnoses, '
+              f'{(unassigned & rows_in_window).sum()} without, {mismatches} sysdiagnoses with different counts')
+
+    # Sort all rows by sysdiagnose and time at once to find the largest gap within each sysdiagnose
+    codes = np.concatenate(codes_list)
+    collected = np.concatenate(collected_list)
+    order = np.lexsort((collected, codes))
+    codes, collected = codes[order], collected[order]
+    gaps = np.diff(collected)
+    same_sysdiagnose = codes[1:] == codes[:-1]
+    largest_gap = np.zeros(sysdiagnose_count)
+    np.maximum.at(largest_gap, codes[1:][same_sysdiagnose], gaps[same_sysdiagnose])
+
+    report['windowStart'] = sysdiagnoses['persistTime'].fillna(sysdiagnoses['highVolumeTime']).to_numpy()
+    report['windowEnd'] = sysdiagnoses['endTimeRef'].to_numpy()
+    report['first'] = np.where(np.isfinite(first), first, np.nan)
+    report['last'] = np.where(np.isfinite(last), last, np.nan)
+    report['coverage'] = ((report['last'] - report['first']) / (report['windowEnd'] - report['windowStart'])).clip(0, 1)
+    report['largestGap'] = largest_gap
+
+    # Merge the log windows of all sysdiagnoses to find periods not covered by any of them
+    windows = report[['windowStart', 'windowEnd']].dropna().sort_values('windowStart').to_numpy()
+    uncovered = np.empty(0)
+    if len(windows) > 1:
+        covered_until = np.maximum.accumulate(windows[:, 1])
+        uncovered = windows[1:, 0] - covered_until[:-1]
+        uncovered = uncovered[uncovered > 0]
+
+    if sysdiagnose_count > 0:
+        print(f'  Window: {datetime.fromtimestamp(np.nanmin(report["windowStart"]))} - '
+              f'{datetime.fromtimestamp(np.nanmax(report["windowEnd"]))}')
+        print(f'  Median Coverage: {report["coverage"].median() * 100:.1f}%')
+        print(f'  Largest Gap: {timedelta(seconds=float(report["largestGap"].max()))}')
+    print(f'  Uncovered Periods: {len(uncovered)} ({timedelta(seconds=float(uncovered.sum()))})')
+
+    # Only list a few sysdiagnoses, as there can be thousands of them
+    mismatching = np.zeros(sysdiagnose_count, dtype=bool)
+    for name in tables:
+        claimed = report[f'{name}Claimed']
+        mismatching |= (claimed.notna() & (claimed != report[f'{name}Actual'])).to_numpy()
+    if mismatching.any():
+        print(f'  Different Counts (Claimed / Actual):')
+        for _, row in report[mismatching].head(listed).iterrows():
+            counts = ', '.join([f'{row[f"{name}Claimed"]:.0f} / {row[f"{name}Actual"]}' for name in tables])
+            print(f'    {row["archiveIdentifier"]}: {counts}')
+        if mismatching.sum() > listed:
+            print(f'    ... and {mismatching.sum() - listed} more')
+
+    if csv_path:
+        report.to_csv(csv_path, index=False)
+        print(f'  Report: {csv_path}')
+    print()
+
+
 def cell_score_category(score: int) -> str:
     if score < 50:
         return 'Untrusted'
@@ -144,40 +1012,58 @@ def cell_score_category(score: int) -> str:
         return 'Trusted'
 
 
+def summarize_user_cells(df: pd.DataFrame) -> dict:
+    summary = {
+        'count': len(df.index),
+        'start': optional_float(df['collected'].min()),
+        'end': optional_float(df['collected'].max()),
+        'measurements': {'Untrusted': 0, 'Suspicious': 0, 'Trusted': 0},
+        'uniqueCells': None,
+    }
+    if summary['count'] == 0:
+        return summary
+
+    category_count = np.bincount(score_category_codes(df['verificationScore'].to_numpy()), minlength=3)
+    summary['measurements'] = dict(zip(SCORE_CATEGORIES, category_count.tolist()))
+
+    if 'technology' in df:
+        unique_df = df.groupby(['technology', 'country', 'network', 'area', 'cell'])[['verificationScore']].min()
+
+        unique_category_count = np.bincount(score_category_codes(unique_df['verificationScore'].to_numpy()), minlength=3)
+        summary['uniqueCells'] = dict(zip(SCORE_CATEGORIES, unique_category_count.tolist()))
+
+    return summary
+
+
 def process_user_cells(df: pd.DataFrame) -> tuple[int, int, int, int]:
-    cell_count = len(df.index)
+    summary = summarize_user_cells(df)
+    cell_count = summary['count']
     if cell_count == 0:
         print('User Cells: None')
         return 0, 0, 0, 0
 
-    score_series = df['verificationScore'].apply(cell_score_category)
-    category_count: dict[Hashable, int] = score_series.groupby(score_series).count().to_dict()
+    category_count = summary['measurements']
 
     print('User Cells:')
-    print(f'  Start: {datetime.fromtimestamp(df["collected"].min())}')
-    print(f'  End: {datetime.fromtimestamp(df["collected"].max())}')
+    print(f'  Start: {datetime.fromtimestamp(summary["start"])}')
+    print(f'  End: {datetime.fromtimestamp(summary["end"])}')
     print(f'  Measurements:')
-    print(f'    Untrusted: {category_count.get("Untrusted", 0)}')
-    print(f'    Suspicious: {category_count.get("Suspicious", 0)}')
-    print(f'    Trusted: {category_count.get("Trusted", 0)}')
+    print(f'    Untrusted: {category_count["Untrusted"]}')
+    print(f'    Suspicious: {category_count["Suspicious"]}')
+    print(f'    Trusted: {category_count["Trusted"]}')
     print(f'    = Sum: {cell_count}')
 
     print(f'  Unique Cells:')
-    if 'technology' in df:
-        unique_df = df.groupby(['technology', 'country', 'network', 'area', 'cell']).min()
-        unique_cell_count = len(unique_df.index)
-
-        unique_score_series = unique_df['verificationScore'].apply(cell_score_category)
-        unique_category_count: dict[Hashable, int] = unique_score_series.groupby(unique_score_series).count().to_dict()
-
-        unique_untrusted = unique_category_count.get("Untrusted", 0)
-        unique_suspicious = unique_category_count.get("Suspicious", 0)
-        unique_trusted = unique_category_count.get("Trusted", 0)
-
-        print(f'    Untrusted: {unique_category_count.get("Untrusted", 0)}')
-        print(f'    Suspicious: {unique_category_count.get("Suspicious", 0)}')
-        print(f'    Trusted: {unique_category_count.get("Trusted", 0)}')
-        print(f'    = Sum: {unique_cell_count}')
+    unique_category_count = summary['uniqueCells']
+    if unique_category_count is not None:
+        unique_untrusted = unique_category_count["Untrusted"]
+        unique_suspicious = unique_category_count["Suspicious"]
+        unique_trusted = unique_category_count["Trusted"]
+
+        print(f'    Untrusted: {unique_untrusted}')
+        print(f'    Suspicious: {unique_suspicious}')
+        print(f'    Trusted: {unique_trusted}')
+        print(f'    = Sum: {unique_untrusted + unique_suspicious + unique_trusted}')
     else:
         print(f'    Missing data, please re-export datasets with CellGuard >= 1.3.4')
         unique_untrusted = 0
@@ -189,24 +1075,281 @@ def process_user_cells(df: pd.DataFrame) -> tuple[int, int, int, int]:
     return cell_count, unique_untrusted, unique_suspicious, unique_trusted
 
 
+def process_user_cells_json(df: pd.DataFrame, fields: list[str]):
+    print('User Cells JSON:')
+    for field in fields:
+        column = df[json_column(field)].dropna()
+        if len(column.index) == 0:
+            print(f'  {field}: None')
+        elif pd.api.types.is_numeric_dtype(column) and not pd.api.types.is_bool_dtype(column):
+            print(f'  {field}: Min {column.min()}, Median {column.median()}, Max {column.max()}')
+        else:
+            top_values = column.value_counts().head(5)
+            print(f'  {field}: ' + ', '.join([f'{value} ({count})' for value, count in top_values.items()]))
+    print()
+
+
+CELL_KEY = ['technology', 'country', 'network', 'area', 'cell']
+
+
+def radix_argsort(keys: np.ndarray) -> np.ndarray:
+    """
+    Stable argsort of non-negative integers in linear time, sorting by 16 bits at a time.
+    NumPy uses a radix sort for stable sorts of 16-bit integers.
+    """
+    order = np.arange(len(keys))
+    shift = 0
+    while shift == 0 or (keys >> shift).any():
+        digits = ((keys[order] >> shift) & 0xFFFF).astype(np.uint16)
+        order = order[np.argsort(digits, kind='stable')]
+        shift += 16
+    return order
+
+
+def score_segments(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Split the measurements of every cell into runs of consecutive measurements with the same score category.
+    The measurements are sorted once by cell and time, afterward all runs are found with a single comparison of
+    neighbouring rows.
+    """
+    df = df.dropna(subset=['verificationScore'])
+    cell_ids = df.groupby(CELL_KEY, sort=False, dropna=False).ngroup().to_numpy()
+    collected = df['collected'].to_numpy(dtype=np.float64)
+
+    # Exports are mostly ordered by time already, which timsort (used for stable sorts of floats) merges in linear time
+    order = np.argsort(collected, kind='stable')
+    order = order[radix_argsort(cell_ids[order])]
+
+    cell_ids = cell_ids[order]
+    collected = collected[order]
+    categories = score_category_codes(df['verificationScore'].to_numpy()[order])
+
+    changes = np.ones(len(order), dtype=bool)
+    changes[1:] = (cell_ids[1:] != cell_ids[:-1]) | (categories[1:] != categories[:-1])
+    starts = np.flatnonzero(changes)
+    ends = np.append(starts[1:], len(order)) - 1
+
+    keys = df[CELL_KEY].iloc[order[starts]].reset_index(drop=True)
+    segments = pd.DataFrame({
+        'cellId': cell_ids[starts],
+        'category': pd.Categorical.from_codes(categories[starts], SCORE_CATEGORIES),
+        'start': collected[starts],
+        'end': collected[ends],
+        'measurements': ends - starts + 1,
+    })
+    return pd.concat([keys, segments], axis=1)
+
+
+def score_flip_mask(segments: pd.DataFrame, window: float) -> np.ndarray:
+    """
+    Mark segments following a segment of the same cell where one is Trusted and the other Suspicious or Untrusted,
+    and the last measurement before and the first measurement after the transition are at most window seconds apart.
+    """
+    cell_ids = segments['cellId'].to_numpy()
+    trusted = segments['category'].cat.codes.to_numpy() == SCORE_CATEGORIES.index('Trusted')
+    start = segments['start'].to_numpy()
+    end = segments['end'].to_numpy()
+
+    # Each segment is compared with its predecessor
+    flips = np.zeros(len(segments.index), dtype=bool)
+    flips[1:] = (
+            (cell_ids[1:] == cell_ids[:-1]) &
+            (trusted[1:] != trusted[:-1]) &
+            (start[1:] - end[:-1] <= window)
+    )
+    return flips
+
+
+def score_flips(segments: pd.DataFrame, window: float) -> pd.DataFrame:
+    """ Returns the flips between Trusted and Suspicious or Untrusted of each cell with the preceding segment. """
+    flips = score_flip_mask(segments, window)
+    previous = np.flatnonzero(flips) - 1
+    end = segments['end'].to_numpy()
+
+    flips_df = segments.loc[flips, CELL_KEY + ['cellId', 'category', 'start']].reset_index(drop=True)
+    flips_df.insert(len(CELL_KEY) + 1, 'previousCategory', segments['category'].to_numpy()[previous])
+    flips_df.insert(len(CELL_KEY) + 2, 'previousEnd', end[previous])
+    return flips_df
+
+
+def process_score_timeline(df: pd.DataFrame, window: float, csv_path: Optional[Path] = None, listed: int = 10):
+    print('Score Timeline:')
+    if 'technology' not in df:
+        print(f'  Missing data, please re-export datasets with CellGuard >= 1.3.4')
+        print()
+        return
+
+    segments = score_segments(df)
+    # The cell IDs are consecutive numbers, so there's no empty bin
+    segment_counts = np.bincount(segments['cellId'].to_numpy())
+    flips = score_flips(segments, window)
+    flip_counts = flips.groupby('cellId').size().sort_values(ascending=False, kind='stable')
+
+    print(f'  Cells: {len(segment_counts)}')
+    print(f'  Segments: {len(segments.index)}')
+    print(f'    Cells with a Single Category: {int((segment_counts == 1).sum())}')
+    print(f'  Flips between Trusted and Suspicious/Untrusted within {window:g}s: {len(flips.index)}')
+    print(f'    Cells: {len(flip_counts.index)}')
+
+    first_flips = flips.drop_duplicates(subset=['cellId']).set_index('cellId')
+    for cell_id, count in flip_counts.head(listed).items():
+        flip = first_flips.loc[cell_id]
+        key = '/'.join(str(flip[column]) for column in CELL_KEY)
+        print(f'    {key}: {count} flips, first at {datetime.fromtimestamp(flip["start"])}')
+    if len(flip_counts.index) > listed:
+        print(f'    ... and {len(flip_counts.index) - listed} more')
+
+    if csv_path:
+        segments.assign(flip=score_flip_mask(segments, window)).to_csv(csv_path, index=False)
+        print(f'  Segments: {csv_path}')
+
+    print()
+
+
+def load_connectivity_events(dirs: list[Path], start: Optional[datetime], end: Optional[datetime]) -> pd.DataFrame:
+    paths = [d.joinpath('connectivity-events.csv') for d in dirs if d.joinpath('connectivity-events.csv').is_file()]
+    if not paths:
+        return pd.DataFrame({'collected': [], 'simSlot': [], 'active': []})
+
+    dfs = [pd.read_csv(path, usecols=['collected', 'simSlot', 'active']) for path in paths]
+    return filter_start_end(pd.concat(dfs), start, end)
+
+
+def downsample_min_max(x: np.ndarray, y: np.ndarray, points: int) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Reduce a series to at most the given number of points by only keeping the minimum and maximum of
+    equally sized buckets, so peaks and gaps remain visible.
+    """
+    if len(y) <= points:
+        return x, y
+
+    size = -(-len(y) // max(points // 2, 1))
+    buckets = -(-len(y) // size)
+
+    # Pad the last bucket, so all buckets can be processed as one matrix
+    padded = np.full(buckets * size, np.nan)
+    padded[:len(y)] = y
+    padded = padded.reshape(buckets, size)
+
+    offsets = np.arange(buckets) * size
+    indices = np.unique(np.concatenate([
+        offsets + np.nanargmin(padded, axis=1),
+        offsets + np.nanargmax(padded, axis=1)
+    ]))
+    return x[indices], y[indices]
+
+
+def time_histogram(collected: np.ndarray, start: float, bins: int, resolution: int) -> np.ndarray:
+    """ Count the timestamps in bins of the resolution (in seconds) starting at the start time. """
+    indices = ((collected - start) // resolution).astype(np.int64)
+    return np.bincount(indices[(indices >= 0) & (indices < bins)], minlength=bins)
+
+
+def process_report(
+        report_path: Path, user_cells_df: pd.DataFrame, packets_df: pd.DataFrame, connectivity_df: pd.DataFrame,
+        points: int, resolution: int
+):
+    import mpld3
+
+    # Render the figures without a display, so reports can be created on servers
+    plt.switch_backend('Agg')
+
+    collected = pd.concat([user_cells_df['collected'], packets_df['collected'], connectivity_df['collected']])
+    if len(collected.index) == 0:
+        print('Report: No data')
+        print()
+        return
+    start = collected.min() // resolution * resolution
+    bins = int((collected.max() - start) // resolution) + 1
+    bin_times = pd.to_datetime(start + np.arange(bins) * resolution, unit='s').to_numpy()
+
+    def rate_figure(title: str, label: str, groups: list[tuple[str, pd.Series]]):
+        fig, ax = plt.subplots(figsize=(12, 4))
+        for name, group_collected in groups:
+            counts = time_histogram(group_collected.to_numpy(dtype=float), start, bins, resolution)
+            ax.plot(*downsample_min_max(bin_times, counts, points), label=name, linewidth=1)
+        ax.set_title(title)
+        ax.set_ylabel(label)
+        ax.legend()
+        return fig
+
+    per = f'per {timedelta(seconds=resolution)}'
+    score_category = user_cells_df['verificationScore'].apply(cell_score_category)
+    figures = [
+        rate_figure('Cell Measurements', f'Measurements {per}', [
+            (category, user_cells_df['collected'][score_category == category])
+            for category in ['Trusted', 'Suspicious', 'Untrusted']
+        ]),
+        rate_figure('Packets', f'Packets {per}', [
+            (str(proto), group['collected']) for proto, group in packets_df.groupby('proto')
+        ]),
+    ]
+
+    fig, ax = plt.subplots(figsize=(12, 4))
+    for sim_slot, group in connectivity_df.sort_values('collected').groupby('simSlot'):
+        active = (group['active'].astype(str).str.lower() == 'true').to_numpy(dtype=float)
+        times = pd.to_datetime(group['collected'], unit='s').to_numpy()
+        ax.step(*downsample_min_max(times, active, points), where='post', label=f'SIM {sim_slot}', linewidth=1)
+    ax.set_title('Connectivity')
+    ax.set_ylabel('Active')
+    ax.legend()
+    figures.append(fig)
+
+    with report_path.open('w') as report_file:
+        report_file.write('<!DOCTYPE html>\n<html><head><meta charset="utf-8">')
+        report_file.write('<title>CellGuard Analysis</title></head><body>\n')
+        report_file.write(f'<h1>CellGuard Analysis</h1>\n<p>{len(user_cells_df.index)} cell measurements, '
+                          f'{len(packets_df.index)} packets, {len(connectivity_df.index)} connectivity events</p>\n')
+        for figure in figures:
+            report_file.write(mpld3.fig_to_html(figure))
+            plt.close(figure)
+        report_file.write('</body></html>\n')
+
+    print(f'Report: {report_path}')
+    print()
+
+
 # https://stackoverflow.com/a/1060330/4106848
 def daterange(start_date, end_date):
     for n in range(int((end_date - start_date).days)):
         yield start_date + timedelta(n)
 
 
-def process_time(df: pd.DataFrame, graph: bool) -> tuple[int, int]:
-    df['day'] = df['collected'].apply(lambda x: datetime.combine(datetime.fromtimestamp(x), time.min).timestamp())
+def count_days(df: pd.DataFrame) -> pd.Series:
+    """ Count the measurements per local day like datetime.fromtimestamp(), but for all rows at once. """
+    collected = df['collected'].to_numpy(dtype=np.float64)
+    collected = collected[~np.isnan(collected)]
+
+    # Think about timezones: UTC offsets only change at quarter-hour boundaries,
+    # so the offset is looked up once per quarter-hour instead of once per row
+    quarters, inverse = np.unique(np.floor(collected / 900), return_inverse=True)
+    local = [datetime.fromtimestamp(quarter * 900) for quarter in quarters]
+    utc = [datetime.fromtimestamp(quarter * 900, timezone.utc).replace(tzinfo=None) for quarter in quarters]
+    offsets = np.array([(local_time - utc_time).total_seconds() for local_time, utc_time in zip(local, utc)])
+
+    days = np.floor((collected + offsets[inverse]) / 86400) * 86400
+    day = pd.Series(pd.to_datetime(days, unit='s'), name='day')
+    return day.groupby(day).count()
+
+
+def summarize_time(df: pd.DataFrame) -> dict:
+    if len(df.index) == 0:
+        return {'daysActive': 0, 'daysTotal': 0}
 
-    start = datetime.fromtimestamp(df['day'].min())
-    end = datetime.fromtimestamp(df['day'].max())
+    day_series = count_days(df)
+    start = day_series.index.min().to_pydatetime()
+    end = day_series.index.max().to_pydatetime()
 
-    days_total = (end - start).days + 1
+    return {
+        'daysActive': len(day_series.drop_duplicates().index),
+        'daysTotal': (end - start).days + 1,
+    }
 
-    # Think about timezones
-    df['day'] = df['collected'].apply(lambda x: datetime.combine(datetime.fromtimestamp(x), time.min))
-    day_series: pd.Series = df.groupby(['day'])['day'].count()
-    days_active = len(day_series.drop_duplicates().index)
+
+def process_time(df: pd.DataFrame, graph: bool) -> tuple[int, int]:
+    summary = summarize_time(df)
+    days_active = summary['daysActive']
+    days_total = summary['daysTotal']
 
     print('Time:')
     print(f'  Days Active: {days_active}')
@@ -216,6 +1359,9 @@ def process_time(df: pd.DataFrame, graph: bool) -> tuple[int, int]:
     if graph:
         # https://pandas.pydata.org/pandas-docs/version/0.13.1/visualization.html
         # https://stackoverflow.com/a/64920221/4106848
+        day_series = count_days(df)
+        start = day_series.index.min().to_pydatetime()
+        end = day_series.index.max().to_pydatetime()
 
         # Add missing day with zero cells to the graph
         for date in daterange(start, end):
@@ -261,6 +1407,200 @@ def process_latex(
     print()
 
 
+@dataclass
+class LoadedCells2:
+    """ The DataFrames of a .cells2 file, each sorted by the collected column to quickly select time windows. """
+    path: Path
+    modified: int
+    info: DeviceJSON
+    als_cells: pd.DataFrame
+    locations: pd.DataFrame
+    packets: pd.DataFrame
+    user_cells: pd.DataFrame
+
+    @staticmethod
+    def load(cells2_file: Path, tmp_dir_path: Path) -> 'LoadedCells2':
+        destination = tmp_dir_path.joinpath(cells2_file.stem)
+        modified = cells2_file.stat().st_mtime_ns
+        extract_cells2(cells2_file, destination)
+        try:
+            return LoadedCells2(
+                path=cells2_file,
+                modified=modified,
+                info=load_info(destination),
+                als_cells=load_als_cells([destination]),
+                locations=load_locations([destination], None, None).sort_values('collected', ignore_index=True),
+                packets=load_packets([destination], None, None).sort_values('collected', ignore_index=True),
+                user_cells=load_user_cells([destination], None, None).sort_values('collected', ignore_index=True),
+            )
+        finally:
+            # Everything is kept in memory, so the extracted files are no longer required
+            shutil.rmtree(destination, ignore_errors=True)
+
+    def matches(self, devices: list[str]) -> bool:
+        return not devices or any(
+            device in (self.path.name, self.path.stem, self.info.name, self.info.identifier_for_vendor)
+            for device in devices
+        )
+
+
+def select_window(dfs: list[pd.DataFrame], start: Optional[float], end: Optional[float]) -> pd.DataFrame:
+    """ Select the rows of sorted DataFrames within the time window using a binary search. """
+    windows = []
+    for df in dfs:
+        collected = df['collected'].to_numpy()
+        lower = collected.searchsorted(start, side='left') if start is not None else 0
+        upper = collected.searchsorted(end, side='right') if end is not None else len(collected)
+        windows.append(df.iloc[lower:upper])
+    return pd.concat(windows, ignore_index=True)
+
+
+class AnalysisServer:
+    """
+    A local HTTP service which keeps the data of all .cells2 files in a directory in memory and
+    answers the summaries of the analysis as JSON for arbitrary time windows and devices.
+
+    GET /files                 Lists the loaded .cells2 files
+    GET /summary               Returns all summaries
+    GET /<section>             Returns one of the summaries: info, locations, packets, als-cells, user-cells, time
+    Query parameters: start and end (UNIX timestamps), devices (comma-separated file names, device names, or IDs)
+    """
+
+    SECTIONS = ['info', 'locations', 'packets', 'als-cells', 'user-cells', 'time']
+
+    def __init__(self, directory: Path, watch_interval: float):
+        self.directory = directory
+        self.watch_interval = watch_interval
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.files: dict[Path, LoadedCells2] = {}
+
+    async def refresh(self):
+        """ Load new or modified .cells2 files and forget about deleted ones. """
+        loop = asyncio.get_running_loop()
+        paths = set(self.directory.glob('*.cells2'))
+
+        for path in list(self.files):
+            if path not in paths:
+                del self.files[path]
+                print(f'Removed {path.name}')
+
+        for path in sorted(paths):
+            loaded = self.files.get(path)
+            if loaded is not None and loaded.modified == path.stat().st_mtime_ns:
+                continue
+            try:
+                # Parsing takes a while, so it runs in another thread while requests are still answered
+                self.files[path] = await loop.run_in_executor(None, LoadedCells2.load, path, Path(self.tmp_dir.name))
+                print(f'Loaded {path.name}')
+            except (OSError, ValueError, KeyError, zipfile.BadZipFile) as e:
+                print(f'Failed to load {path.name}: {e}')
+
+    async def watch(self):
+        while True:
+            await asyncio.sleep(self.watch_interval)
+            await self.refresh()
+
+    @staticmethod
+    def summarize(section: str, files: list[LoadedCells2], start: Optional[float], end: Optional[float]) -> dict:
+        def window(name: str) -> pd.DataFrame:
+            return select_window([getattr(file, name) for file in files], start, end)
+
+        summaries = {
+            'info': lambda: summarize_info([file.info for file in files]),
+            'locations': lambda: summarize_locations(window('locations')),
+            'packets': lambda: summarize_packets(window('packets')),
+            'als-cells': lambda: summarize_als_cells(pd.concat([file.als_cells for file in files])),
+            'user-cells': lambda: summarize_user_cells(window('user_cells')),
+            'time': lambda: summarize_time(window('user_cells')),
+        }
+        if section == 'summary':
+            return {name: summary() for name, summary in summaries.items()}
+        return summaries[section]()
+
+    @staticmethod
+    def respond(target: str, loaded_files: list[LoadedCells2]) -> tuple[int, object]:
+        """ Answer a request from another thread, so it only works on a snapshot of the loaded files. """
+        url = urlsplit(target)
+        query = parse_qs(url.query)
+        section = url.path.strip('/')
+
+        if section == 'files':
+            return 200, [{
+                'file': file.path.name,
+                'device': file.info.simple_string(),
+                'identifierForVendor': file.info.identifier_for_vendor,
+            } for file in loaded_files]
+        if section != 'summary' and section not in AnalysisServer.SECTIONS:
+            return 404, {'error': f'Unknown path {url.path}'}
+
+        try:
+            start = float(query['start'][0]) if 'start' in query else None
+            end = float(query['end'][0]) if 'end' in query else None
+        except ValueError:
+            return 400, {'error': 'start and end must be UNIX timestamps'}
+        devices = [device for value in query.get('devices', []) for device in value.split(',') if device]
+
+        files = [file for file in loaded_files if file.matches(devices)]
+        if not files:
+            return 404, {'error': 'No .cells2 file matches the devices'}
+
+        return 200, AnalysisServer.summarize(section, files, start, end)
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            request_line = (await reader.readline()).decode('latin-1').split()
+            # Skip the headers of the request
+            while (await reader.readline()).strip():
+                pass
+
+            if len(request_line) != 3:
+                status, body = 400, {'error': 'Malformed request'}
+            elif request_line[0] != 'GET':
+                status, body = 405, {'error': 'Only GET requests are supported'}
+            else:
+                # The watcher modifies the files on this thread, so the worker thread gets a snapshot
+                loop = asyncio.get_running_loop()
+                loaded_files = list(self.files.values())
+                try:
+                    status, body = await loop.run_in_executor(None, self.respond, request_line[1], loaded_files)
+                except Exception as e:
+                    print(f'Failed to answer {request_line[1]}: {e!r}')
+                    status, body = 500, {'error': 'Internal server error'}
+
+            data = json.dumps(body).encode('utf-8')
+            reason = {
+                200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed', 500: 'Internal Server Error'
+            }[status]
+            writer.write(
+                f'HTTP/1.1 {status} {reason}\r\nContent-Type: application/json\r\n'
+                f'Content-Length: {len(data)}\r\nConnection: close\r\n\r\n'.encode('latin-1') + data
+            )
+            await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host: str, port: int, unix_socket: Optional[Path]):
+        print(f'Loading all cells2 files in the directory {self.directory}')
+        await self.refresh()
+
+        if unix_socket:
+            server = await asyncio.start_unix_server(self.handle, path=unix_socket)
+            print(f'Listening on {unix_socket}')
+        else:
+            server = await asyncio.start_server(self.handle, host=host, port=port)
+            print(f'Listening on http://{host}:{port}')
+
+        watcher = asyncio.create_task(self.watch())
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            watcher.cancel()
+            self.tmp_dir.cleanup()
+
+
 def main():
     parser = argparse.ArgumentParser(
         prog='analyze_cells2.py',
@@ -271,6 +1611,90 @@ def main():
     parser.add_argument('-g', '--graph', action='store_true')
     parser.add_argument('-s', '--start', type=int)
     parser.add_argument('-e', '--end', type=int)
+    parser.add_argument(
+        '-j', '--json-fields', type=lambda x: [field for field in x.split(',') if field],
+        help='Comma-separated fields to extract from the json column of user-cells.csv, e.g. bandwidth,band'
+    )
+    parser.add_argument(
+        '-d', '--sysdiagnoses', action='store_true',
+        help='Compare the counts of sysdiagnoses.csv with the imported rows and report their time coverage'
+    )
+    parser.add_argument(
+        '--sysdiagnoses-csv', type=Path,
+        help='Write the per-sysdiagnose coverage report as CSV file'
+    )
+    parser.add_argument(
+        '-r', '--report', type=Path,
+        help='Write an interactive HTML report with time series of the data'
+    )
+    parser.add_argument(
+        '--report-points', type=int, default=2000,
+        help='Maximum number of points per time series in the HTML report'
+    )
+    parser.add_argument(
+        '--report-resolution', type=int, default=60,
+        help='Width of the time bins in seconds for the HTML report'
+    )
+    parser.add_argument(
+        '-p', '--packet-rates', action='store_true',
+        help='Profile the packet rate per protocol, direction, and SIM slot including bursts and silent gaps'
+    )
+    parser.add_argument(
+        '--packet-resolution', type=float, default=1.0, help='Width of the time bins in seconds for packet rates'
+    )
+    parser.add_argument(
+        '--burst-threshold', type=int, default=50, help='Minimum number of packets in a time bin to count as burst'
+    )
+    parser.add_argument(
+        '--gap-threshold', type=float, default=600.0,
+        help='Minimum time in seconds between two packets to count as silent gap'
+    )
+    parser.add_argument(
+        '--chunksize', type=int, default=500000,
+        help='Number of packets read at once when profiling packet rates, '
+             'packets out of order are sorted in runs of this size in the temporary directory'
+    )
+    parser.add_argument(
+        '-c', '--score-timeline', action='store_true',
+        help='Analyze how the verification score of each cell evolves and find cells flipping between categories'
+    )
+    parser.add_argument(
+        '--flip-window', type=float, default=3600.0,
+        help='Maximum time in seconds between two measurements of a cell to count a change of its category as flip'
+    )
+    parser.add_argument('--score-timeline-csv', type=Path, help='Write the score segments of all cells as CSV file')
+    parser.add_argument(
+        '-l', '--location-tiles', action='store_true',
+        help='Aggregate locations and the measurements recorded at them in tiles of multiple zoom levels'
+    )
+    parser.add_argument(
+        '--tile-zooms', type=lambda x: [int(zoom) for zoom in x.split(',') if zoom], default=[8, 12, 16],
+        help=f'Comma-separated zoom levels of the tiles between 0 and {TILE_MAX_ZOOM}'
+    )
+    parser.add_argument(
+        '--tile-tolerance', type=float, default=30.0,
+        help='Maximum time difference in seconds between a measurement and the location assigned to it'
+    )
+    parser.add_argument('--tiles-geojson', type=Path, help='Write the tiles as GeoJSON file')
+    parser.add_argument(
+        '--bbox', type=lambda x: [float(value) for value in x.split(',')],
+        help='Count the locations and measurements within a bounding box given as south,west,north,east'
+    )
+    parser.add_argument(
+        '--serve', action='store_true',
+        help='Keep the data of all cells2 files in the directory in memory and answer queries as JSON over HTTP'
+    )
+    parser.add_argument('--host', default='127.0.0.1', help='Host address of the analysis service')
+    parser.add_argument('--port', type=int, default=8642, help='Port of the analysis service')
+    parser.add_argument('--unix-socket', type=Path, help='Listen on a Unix socket instead of a TCP port')
+    parser.add_argument(
+        '--watch-interval', type=float, default=5.0,
+        help='Interval in seconds for checking the directory for new cells2 files'
+    )
+    parser.add_argument(
+        '--cache-dir', type=Path, default=Path.home().joinpath('.cache', 'analyze_cells2'),
+        help='Directory for caching fields extracted from the json column'
+    )
 
     args = parser.parse_args()
     path: Path = args.path
@@ -278,6 +1702,31 @@ def main():
     graph: bool = args.graph
     start_time: Optional[datetime] = datetime.fromtimestamp(args.start) if args.start else None
     end_time: Optional[datetime] = datetime.fromtimestamp(args.end) if args.end else None
+    json_fields: list[str] = args.json_fields or []
+    if min(args.packet_resolution, args.burst_threshold, args.gap_threshold, args.chunksize) <= 0:
+        print(f'The resolution, thresholds, and chunk size of the packet rates must be positive')
+        return
+    if args.report_points <= 0 or args.report_resolution <= 0:
+        print(f'The number of points and the resolution of the report must be positive')
+        return
+    if any(zoom < 0 or zoom > TILE_MAX_ZOOM for zoom in args.tile_zooms):
+        print(f'The zoom levels of the tiles must be between 0 and {TILE_MAX_ZOOM}')
+        return
+    if args.bbox and len(args.bbox) != 4:
+        print(f'The bounding box must consist of four values: south,west,north,east')
+        return
+    cache_dir: Path = args.cache_dir
+
+    if args.serve:
+        if not path.is_dir():
+            print(f'The path must be a directory containing cells2 files')
+            return
+        server = AnalysisServer(path, args.watch_interval)
+        try:
+            asyncio.run(server.serve(args.host, args.port, args.unix_socket))
+        except KeyboardInterrupt:
+            pass
+        return
 
     cells2_files = []
     if path.is_dir():
@@ -308,13 +1757,38 @@ def main():
     tmp_dirs = list(tmp_name_dirs.values())
 
     process_info(tmp_dirs)
-    location_count = process_locations(tmp_dirs, start_time, end_time)
-    packet_count = process_packets(tmp_dirs, start_time, end_time)
+    locations_df = load_locations(tmp_dirs, start_time, end_time)
+    location_count = process_locations(locations_df)
+    # The packet rates are computed in chunks, so all packets are only loaded at once if required for the report
+    packet_profile = profile_packet_rates(
+        tmp_dirs, start_time, end_time,
+        args.packet_resolution, args.burst_threshold, args.gap_threshold, args.chunksize
+    ) if args.packet_rates else None
+    packets_df = load_packets(tmp_dirs, start_time, end_time) if packet_profile is None or args.report else None
+    packet_count = process_packets(packet_profile.summarize() if packet_profile else summarize_packets(packets_df))
+    if packet_profile:
+        process_packet_rates(packet_profile)
     process_als_cells(tmp_dirs)
+    if args.sysdiagnoses or args.sysdiagnoses_csv:
+        process_sysdiagnoses(tmp_dirs, start_time, end_time, args.sysdiagnoses_csv)
 
-    user_cells_df = load_user_cells(tmp_dirs, start_time, end_time)
+    digests = [cells2_digest(file) for file in cells2_files] if json_fields else None
+    user_cells_df = load_user_cells(tmp_dirs, start_time, end_time, json_fields, digests, cache_dir)
     cell_measurements, unique_untrusted, unique_suspicious, unique_trusted = process_user_cells(user_cells_df)
+    if json_fields:
+        process_user_cells_json(user_cells_df, json_fields)
     days_active, days_total = process_time(user_cells_df, graph)
+    if args.score_timeline or args.score_timeline_csv:
+        process_score_timeline(user_cells_df, args.flip_window, args.score_timeline_csv)
+    if args.location_tiles or args.tiles_geojson or args.bbox:
+        process_location_tiles(
+            locations_df, user_cells_df, args.tile_zooms, args.tile_tolerance, args.tiles_geojson, args.bbox
+        )
+    if args.report:
+        connectivity_df = load_connectivity_events(tmp_dirs, start_time, end_time)
+        process_report(
+            args.report, user_cells_df, packets_df, connectivity_df, args.report_points, args.report_resolution
+        )
     if latex_table:
         process_latex(
             days_active, days_total,
@@ -1,115 +1,563 @@
 import argparse
+import hashlib
+import json
 import os.path
 import re
+import struct
 import subprocess
+import time
+import traceback
 import zipfile
+import zlib
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from datetime import datetime
 from shutil import which
 from pathlib import Path
+from typing import Any, BinaryIO, Callable, Optional
 
 from yaspin import yaspin
 
 
-def build_rust_src():
-    with yaspin(text="Building Native Libraries...") as spinner:
-        env = os.environ.copy()
-        env['CONFIGURATION'] = 'Release'
-        env['PROJECT_DIR'] = os.path.dirname(__file__)
+PROJECT_DIR = Path(__file__).parent
+RUST_DIR = PROJECT_DIR.parent.joinpath('CellGuardAppRust')
+# The build script of the Rust library writes the swift-bridge sources into this directory
+GENERATED_DIR = PROJECT_DIR.joinpath('Generated')
+APP_NAME = 'CellGuard Jailbreak'
 
-        process = subprocess.run(
-            './build-rust.sh',
-            env=env,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            shell=True,
-            cwd=Path(__file__).parent,
-        )
-        if process.returncode == 0:
-            spinner.ok("🟢")
-        else:
-            spinner.fail("🔴")
-            print(str(process.stderr).replace('\\n', '\n').replace('\\t', '\t'))
-            print("Hint: Make sure that the Rust toolchain is installed and run "
-                  "\"CONFIGURATION=Release PROJECT_DIR=. ./build-rust.sh\" to debug the error")
-            exit(1)
+
+class BuildError(Exception):
+    """ Raised by a build stage if one of its commands fails. """
+
+    def __init__(self, exit_code: int, hint: Optional[str] = None):
+        super().__init__(hint)
+        self.exit_code = exit_code
+        self.hint = hint
+
+
+class StageLog:
+    """
+    Streams the combined stdout and stderr of a stage's commands into its log file
+    while only keeping the last lines in memory.
+    """
+
+    def __init__(self, path: Path, tail_lines: int = 40):
+        self.path = path
+        self.tail: deque[bytes] = deque(maxlen=tail_lines)
+        self.exit_code: Optional[int] = None
+
+    def run(self, args: list[str] | str, hint: Optional[str] = None, capture: bool = False, **kwargs) -> bytes:
+        """ Run a command and return its complete output if capture is set. """
+        captured: list[bytes] = []
+        command = args if isinstance(args, str) else ' '.join(args)
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self.path.open('ab') as log_file:
+            log_file.write(f'$ {command}\n'.encode('utf-8'))
+            process = subprocess.Popen(
+                args, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, cwd=PROJECT_DIR, **kwargs
+            )
+            for line in process.stdout:
+                log_file.write(line)
+                self.tail.append(line)
+                if capture:
+                    captured.append(line)
+            self.exit_code = process.wait()
+
+        if self.exit_code != 0:
+            raise BuildError(self.exit_code, hint)
+        return b''.join(captured)
+
+    def write_exception(self, exception: Exception):
+        """ Append the traceback of an exception raised by the stage itself to the log. """
+        lines = [line.encode('utf-8') for line in traceback.format_exception(exception)]
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self.path.open('ab') as log_file:
+            log_file.writelines(lines)
+        self.tail.extend(lines)
+
+    def tail_text(self) -> str:
+        return b''.join(self.tail).decode('utf-8', errors='replace')
+
+
+def build_rust_src(log: StageLog):
+    env = os.environ.copy()
+    env['CONFIGURATION'] = 'Release'
+    env['PROJECT_DIR'] = str(PROJECT_DIR)
+
+    log.run(
+        './build-rust.sh', env=env, shell=True,
+        hint="Make sure that the Rust toolchain is installed and run "
+             "\"CONFIGURATION=Release PROJECT_DIR=. ./build-rust.sh\" to debug the error"
+    )
 
 
-@yaspin(text="Getting Build Settings...")
-def get_build_settings() -> tuple[str, str]:
+def get_build_settings(log: StageLog) -> tuple[str, str]:
     # https://stackoverflow.com/a/59671351
     # https://stackoverflow.com/a/4760517
 
-    with yaspin(text="Getting Build Settings...") as spinner:
-        process = subprocess.run(
-            ['xcodebuild', '-showBuildSettings'],
-            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
-            cwd=Path(__file__).parent,
+    settings = log.run(['xcodebuild', '-showBuildSettings'], capture=True).decode('utf-8')
+
+    version_matches = re.findall(r'MARKETING_VERSION = ([\d.]+)', settings)
+    version = version_matches[0]
+
+    version_matches = re.findall(r'CURRENT_PROJECT_VERSION = (\d+)', settings)
+    build = version_matches[0]
+
+    return version, build
+
+
+def build_archive(log: StageLog) -> Path:
+    # https://github.com/MrKai77/Export-unsigned-ipa-files
+
+    log.run([
+        'xcodebuild', 'archive',
+        '-scheme', 'CellGuard (Jailbreak)',
+        '-archivePath', 'build/CellGuard.xcarchive',
+        '-configuration', 'Release',
+        'CODE_SIGN_IDENTITY=', 'CODE_SIGNING_REQUIRED=NO', 'CODE_SINGING_ALLOWED=NO'
+    ], hint="Run \"Product -> Archive\" in XCode to debug the issue, then run this command again")
+
+    return PROJECT_DIR.joinpath('build', 'CellGuard.xcarchive')
+
+
+def get_app_path(archive_path: Path) -> Path:
+    return archive_path.joinpath('Products', 'Applications', f'{APP_NAME}.app')
+
+
+def sign_executable(archive_path: Path, log: StageLog):
+    exe_path = get_app_path(archive_path).joinpath(APP_NAME)
+    log.run(['ldid', '-Sentitlements-trollstore.plist', f'{exe_path.absolute()}'])
+
+
+def fingerprint(paths: list[Path], extra: str = '') -> str:
+    """ Hash the content of all files in the given paths together with the extra string. """
+    sha = hashlib.sha256(extra.encode('utf-8'))
+
+    for root in paths:
+        files = sorted(p for p in root.rglob('*') if p.is_file()) if root.is_dir() else [root]
+        for file in files:
+            sha.update(str(file.relative_to(PROJECT_DIR.parent)).encode('utf-8'))
+            if file.is_file():
+                with file.open('rb') as f:
+                    sha.update(hashlib.file_digest(f, 'sha256').digest())
+            else:
+                sha.update(b'missing')
+
+    return sha.hexdigest()
+
+
+@dataclass
+class Stage:
+    """
+    A step of the build. It receives the results of all stages it depends on.
+    Stages with a fingerprint function are skipped if their fingerprint matches the one recorded after their last
+    successful run and all their outputs exist, stages without one always run.
+    """
+    name: str
+    text: str
+    run: Callable[[dict[str, Any], StageLog], Any]
+    dependencies: list[str] = field(default_factory=list)
+    fingerprint: Optional[Callable[[dict[str, Any]], str]] = None
+    outputs: Callable[[dict[str, Any]], list[Path]] = lambda results: []
+
+
+@dataclass
+class StageReport:
+    name: str
+    status: str
+    duration: float
+    exit_code: Optional[int]
+    log: Optional[Path]
+
+
+class StageRunner:
+    """
+    Runs independent stages concurrently and records their fingerprints and results in a state file.
+    The output of each stage is written to its own file in the log directory.
+    """
+
+    def __init__(self, stages: list[Stage], state_path: Path, log_dir: Path):
+        self.stages = {stage.name: stage for stage in stages}
+        self.state_path = state_path
+        self.log_dir = log_dir
+        self.started = datetime.now()
+        self.state: dict[str, dict[str, Any]] = {}
+        self.results: dict[str, Any] = {}
+        self.reports: list[StageReport] = []
+        self.duration = 0.0
+
+        if state_path.is_file():
+            with state_path.open('r') as state_file:
+                try:
+                    self.state = json.load(state_file)
+                except json.JSONDecodeError:
+                    self.state = {}
+
+    def save_state(self):
+        self.state_path.parent.mkdir(parents=True, exist_ok=True)
+        with self.state_path.open('w') as state_file:
+            json.dump(self.state, state_file, indent=2)
+
+    def is_up_to_date(self, stage: Stage, results: dict[str, Any]) -> bool:
+        previous = self.state.get(stage.name)
+        if stage.fingerprint is None or previous is None:
+            return False
+        if not all(output.exists() for output in stage.outputs(results)):
+            return False
+        return previous['fingerprint'] == stage.fingerprint(results)
+
+    def execute(self, stage: Stage, results: dict[str, Any], log: StageLog) -> tuple[str, Any]:
+        """ Runs in a worker thread and returns whether the stage was skipped together with its result. """
+        if self.is_up_to_date(stage, results):
+            return 'skipped', self.state[stage.name]['result']
+
+        log.path.unlink(missing_ok=True)
+        result = stage.run(results, log)
+        if stage.fingerprint is not None:
+            # Compute the fingerprint after the run as some stages (like signing) modify their inputs
+            self.state[stage.name] = {'fingerprint': stage.fingerprint(results), 'result': result}
+        return 'ran', result
+
+    def run(self) -> dict[str, Any]:
+        remaining = dict(self.stages)
+        running: dict[Future, tuple[Stage, StageLog, float]] = {}
+        run_start = time.perf_counter()
+        self.started = datetime.now()
+
+        with yaspin() as spinner, ThreadPoolExecutor() as executor:
+            while remaining or running:
+                # Start all stages whose dependencies have finished
+                for name, stage in list(remaining.items()):
+                    if all(dependency in self.results for dependency in stage.dependencies):
+                        del remaining[name]
+                        log = StageLog(self.log_dir.joinpath(f'{name}.log'))
+                        future = executor.submit(self.execute, stage, dict(self.results), log)
+                        running[future] = (stage, log, time.perf_counter())
+
+                spinner.text = ' '.join(stage.text for stage, _, _ in running.values())
+                done, _ = wait(running.keys(), return_when=FIRST_COMPLETED)
+
+                for future in done:
+                    stage, log, start = running.pop(future)
+                    duration = time.perf_counter() - start
+                    try:
+                        status, result = future.result()
+                    except Exception as e:
+                        if isinstance(e, BuildError):
+                            exit_code, hint = e.exit_code, e.hint
+                        else:
+                            # Other exceptions (e.g. a missing command) are recorded like a failing command
+                            log.write_exception(e)
+                            exit_code, hint = None, None
+                        self.reports.append(StageReport(stage.name, 'failed', duration, exit_code, log.path))
+                        self.duration = time.perf_counter() - run_start
+                        spinner.text = stage.text
+                        spinner.fail("🔴")
+                        print(log.tail_text())
+                        print(f'The complete output is available at {log.path}')
+                        if hint:
+                            print(f'Hint: {hint}')
+                        executor.shutdown(wait=True, cancel_futures=True)
+                        self.save_state()
+                        self.save_report()
+                        self.print_report()
+                        exit(1)
+
+                    self.duration = time.perf_counter() - run_start
+                    self.results[stage.name] = result
+                    log_path = log.path if status == 'ran' and log.path.exists() else None
+                    self.reports.append(StageReport(stage.name, status, duration, log.exit_code, log_path))
+                    skipped = ' (up-to-date)' if status == 'skipped' else ''
+                    spinner.write(f'🟢 {stage.text}{skipped} {duration:.1f}s')
+
+            spinner.text = ''
+
+        self.save_state()
+        self.save_report()
+        return self.results
+
+    def dry_run(self):
+        """ Print which stages would run without executing any of them. """
+        pending: set[str] = set()
+        results = {name: entry['result'] for name, entry in self.state.items()}
+
+        for stage in self.topological_order():
+            if any(dependency in pending for dependency in stage.dependencies):
+                status = 'run (inputs depend on previous stages)' if stage.fingerprint else 'run'
+            elif self.is_up_to_date(stage, results):
+                status = 'skip (up-to-date)'
+            else:
+                status = 'run'
+
+            if status != 'skip (up-to-date)':
+                pending.add(stage.name)
+            print(f'  {stage.name}: {status}')
+
+    def topological_order(self) -> list[Stage]:
+        order: list[Stage] = []
+        visited: set[str] = set()
+
+        def visit(stage: Stage):
+            if stage.name in visited:
+                return
+            visited.add(stage.name)
+            for dependency in stage.dependencies:
+                visit(self.stages[dependency])
+            order.append(stage)
+
+        for stage in self.stages.values():
+            visit(stage)
+        return order
+
+    def print_report(self):
+        print('Build Stages:')
+        for report in self.reports:
+            print(f'  {report.name:<10} {report.status:<8} {report.duration:6.1f}s')
+        print(f'  {"total":<10} {"":<8} {self.duration:6.1f}s')
+
+    def save_report(self):
+        """
+        Write the stage durations and exit codes as JSON into the log directory.
+        Every report is also appended to a history file to track the build time across releases.
+        """
+        report = {
+            'started': self.started.isoformat(timespec='seconds'),
+            'duration': self.duration,
+            'results': self.results,
+            'stages': [{
+                'name': report.name,
+                'status': report.status,
+                'duration': report.duration,
+                'exitCode': report.exit_code,
+                'log': str(report.log) if report.log else None,
+            } for report in self.reports],
+        }
+
+        self.log_dir.mkdir(parents=True, exist_ok=True)
+        with self.log_dir.joinpath('build-report.json').open('w') as report_file:
+            json.dump(report, report_file, indent=2)
+        with self.log_dir.joinpath('build-history.jsonl').open('a') as history_file:
+            history_file.write(json.dumps(report) + '\n')
+
+
+# File formats which are already compressed and don't shrink further when deflated
+COMPRESSED_SUFFIXES = {
+    '.car', '.png', '.jpg', '.jpeg', '.heic', '.webp', '.gif', '.gz', '.zip', '.mp3', '.mp4', '.m4a', '.mov',
+}
+
+# A fixed timestamp for all entries, so the IPA only changes if its content changes
+# https://reproducible-builds.org/docs/source-date-epoch/
+IPA_DATE_TIME = (1980, 1, 1, 0, 0, 0)
+
+# https://pkware.cachefly.net/webdocs/casestudies/APPNOTE.TXT
+ZIP_LOCAL_HEADER = struct.Struct('<4s2B4HL2L2H')
+ZIP_CENTRAL_HEADER = struct.Struct('<4s4B4HL2L5H2L')
+ZIP_END_RECORD = struct.Struct('<4s4H2LH')
+
+
+@dataclass
+class IPAEntry:
+    arcname: str
+    sha256: str
+    crc: int
+    file_size: int
+    compress_type: int
+    data: bytes
+    external_attr: int
+    reused: bool = False
+
+
+@dataclass
+class IPAManifest:
+    """ Describes the IPA created last, so that its compressed entries can be reused by the next build. """
+    ipa_path: Path
+    compresslevel: int
+    store_compressed: bool
+    entries: dict[str, str]
+
+    @staticmethod
+    def load(manifest_path: Path) -> Optional['IPAManifest']:
+        if not manifest_path.is_file():
+            return None
+
+        with manifest_path.open('r') as manifest_file:
+            try:
+                data = json.load(manifest_file)
+            except json.JSONDecodeError:
+                return None
+
+        manifest = IPAManifest(
+            ipa_path=Path(data['ipa']),
+            compresslevel=data['compresslevel'],
+            store_compressed=data['storeCompressed'],
+            entries=data['entries'],
         )
-        if process.returncode == 0:
-            spinner.ok("🟢")
-        else:
-            spinner.fail("🔴")
+        return manifest if manifest.ipa_path.is_file() else None
 
-        settings = process.stdout.decode('utf-8')
+    def save(self, manifest_path: Path):
+        with manifest_path.open('w') as manifest_file:
+            json.dump({
+                'ipa': str(self.ipa_path),
+                'compresslevel': self.compresslevel,
+                'storeCompressed': self.store_compressed,
+                'entries': self.entries,
+            }, manifest_file, indent=2)
 
-        version_matches = re.findall(r'MARKETING_VERSION = ([\d.]+)', settings)
-        version = version_matches[0]
 
-        version_matches = re.findall(r'CURRENT_PROJECT_VERSION = (\d+)', settings)
-        build = version_matches[0]
+def read_raw_entry(zip_file: BinaryIO, info: zipfile.ZipInfo) -> bytes:
+    """ Read the still compressed data of an entry from a ZIP file. """
+    zip_file.seek(info.header_offset)
+    header = ZIP_LOCAL_HEADER.unpack(zip_file.read(ZIP_LOCAL_HEADER.size))
+    zip_file.seek(header[10] + header[11], os.SEEK_CUR)
+    return zip_file.read(info.compress_size)
 
-        return version, build
 
+def compress_file(
+        file_path: Path, arcname: str, compresslevel: int, store: bool,
+        previous_ipa: Optional[Path], previous_info: Optional[zipfile.ZipInfo], previous_sha256: Optional[str]
+) -> IPAEntry:
+    data = file_path.read_bytes()
+    sha256 = hashlib.sha256(data).hexdigest()
+    crc = zlib.crc32(data)
+    external_attr = (file_path.stat().st_mode & 0xFFFF) << 16
 
-def build_archive() -> Path:
-    # https://github.com/MrKai77/Export-unsigned-ipa-files
+    # Copy the compressed data from the previous IPA if the file has not changed
+    if previous_info is not None and previous_sha256 == sha256 \
+            and previous_info.CRC == crc and previous_info.file_size == len(data):
+        with previous_ipa.open('rb') as previous_file:
+            compressed = read_raw_entry(previous_file, previous_info)
+        return IPAEntry(arcname, sha256, crc, len(data), previous_info.compress_type, compressed, external_attr, True)
 
-    with yaspin(text="Building CellGuard...") as spinner:
-        process = subprocess.run([
-            'xcodebuild', 'archive',
-            '-scheme', 'CellGuard (Jailbreak)',
-            '-archivePath', 'build/CellGuard.xcarchive',
-            '-configuration', 'Release',
-            'CODE_SIGN_IDENTITY=', 'CODE_SIGNING_REQUIRED=NO', 'CODE_SINGING_ALLOWED=NO'
-        ], stdout=subprocess.PIPE, stderr=subprocess.PIPE, cwd=Path(__file__).parent)
-        if process.returncode == 0:
-            spinner.ok("🟢")
-        else:
-            spinner.fail("🔴")
-            print(str(process.stderr).replace('\\n', '\n').replace('\\t', '\t'))
-            print("Hint: Run \"Product -> Archive\" in XCode to debug the issue, then run this command again")
-            exit(1)
-
-    return Path(__file__).parent.joinpath('build', 'CellGuard.xcarchive')
-
-
-def sign_executable(archive_path: Path):
-    with yaspin(text="Signing executable...") as spinner:
-        app_path = archive_path.joinpath('Products', 'Applications', 'CellGuard Jailbreak.app')
-        exe_path = app_path.joinpath('CellGuard Jailbreak')
-        process = subprocess.run([
-            'ldid', '-Sentitlements-trollstore.plist', f'{exe_path.absolute()}'
-        ], stdout=subprocess.PIPE, stderr=subprocess.PIPE, cwd=Path(__file__).parent)
-        if process.returncode == 0:
-            spinner.ok("🟢")
-        else:
-            spinner.fail("🔴")
-            print(str(process.stderr).replace('\\n', '\n').replace('\\t', '\t'))
-            exit(1)
+    if not store:
+        # zlib releases the GIL, so multiple files are compressed in parallel
+        compressor = zlib.compressobj(compresslevel, zlib.DEFLATED, -zlib.MAX_WBITS)
+        compressed = compressor.compress(data) + compressor.flush()
+        if len(compressed) < len(data):
+            return IPAEntry(arcname, sha256, crc, len(data), zipfile.ZIP_DEFLATED, compressed, external_attr)
+
+    return IPAEntry(arcname, sha256, crc, len(data), zipfile.ZIP_STORED, data, external_attr)
+
+
+class IPAWriter:
+    """
+    Writes the entries of a ZIP file in the given order with fixed timestamps.
+    In contrast to zipfile.ZipFile, it accepts data which has already been compressed.
+    """
+
+    def __init__(self, file: BinaryIO):
+        self.file = file
+        self.central_directory: list[bytes] = []
+        year, month, day, hour, minute, second = IPA_DATE_TIME
+        self.dos_time = hour << 11 | minute << 5 | second // 2
+        self.dos_date = (year - 1980) << 9 | month << 5 | day
+
+    def write(self, entry: IPAEntry):
+        offset = self.file.tell()
+        name = entry.arcname.encode('utf-8')
+        # Set the language encoding flag for non-ASCII file names
+        flag_bits = 0x800 if not entry.arcname.isascii() else 0
+        if offset > 0xFFFFFFFF or len(entry.data) > 0xFFFFFFFF or entry.file_size > 0xFFFFFFFF:
+            raise ValueError(f'{entry.arcname} exceeds the ZIP size limits')
+
+        self.file.write(ZIP_LOCAL_HEADER.pack(
+            b'PK\x03\x04', 20, 0, flag_bits, entry.compress_type, self.dos_time, self.dos_date,
+            entry.crc, len(entry.data), entry.file_size, len(name), 0
+        ))
+        self.file.write(name)
+        self.file.write(entry.data)
+
+        self.central_directory.append(ZIP_CENTRAL_HEADER.pack(
+            b'PK\x01\x02', 20, 3, 20, 0, flag_bits, entry.compress_type, self.dos_time, self.dos_date,
+            entry.crc, len(entry.data), entry.file_size, len(name), 0, 0, 0, 0, entry.external_attr, offset
+        ) + name)
 
-def create_ipa(archive_path: Path, ipa_path: Path):
+    def close(self):
+        offset = self.file.tell()
+        for header in self.central_directory:
+            self.file.write(header)
+        size = self.file.tell() - offset
+
+        if len(self.central_directory) > 0xFFFF:
+            raise ValueError('The IPA contains too many files')
+        self.file.write(ZIP_END_RECORD.pack(
+            b'PK\x05\x06', 0, 0, len(self.central_directory), len(self.central_directory), size, offset, 0
+        ))
+
+
+def create_ipa(
+        archive_path: Path, ipa_path: Path,
+        compresslevel: int = 6, store_compressed: bool = False, workers: Optional[int] = None
+) -> int:
+    """ Create the IPA file and return how many compressed files were reused from the previous IPA. """
     # https://github.com/MrKai77/Export-unsigned-ipa-files
     # https://stackoverflow.com/a/1855122
     # https://realpython.com/python-zipfile/#creating-a-zip-file-from-multiple-regular-files
 
-    with yaspin(text="Creating IPA file...") as spinner:
-        app_path = archive_path.joinpath('Products', 'Applications', 'CellGuard Jailbreak.app')
-        with zipfile.ZipFile(ipa_path, 'w') as ipa_file:
-            for file_path in app_path.rglob('*'):
-                file_zip_path = Path.joinpath(Path('Payload'), file_path.relative_to(app_path.parent))
-                ipa_file.write(filename=file_path, arcname=file_zip_path)
+    app_path = get_app_path(archive_path)
+    manifest_path = ipa_path.parent.joinpath('ipa-manifest.json')
+
+    # Only reuse entries if they were compressed with the same settings
+    previous = IPAManifest.load(manifest_path)
+    if previous and (previous.compresslevel != compresslevel or previous.store_compressed != store_compressed):
+        previous = None
+    previous_infos: dict[str, zipfile.ZipInfo] = {}
+    if previous:
+        with zipfile.ZipFile(previous.ipa_path, 'r') as previous_zip:
+            previous_infos = {info.filename: info for info in previous_zip.infolist()}
+
+    # Write the IPA to a temporary file first as the previous IPA might have the same path
+    tmp_ipa_path = ipa_path.with_name(ipa_path.name + '.tmp')
+    manifest = IPAManifest(ipa_path, compresslevel, store_compressed, {})
+    workers = workers or os.cpu_count() or 1
+    reused = 0
+
+    with ThreadPoolExecutor(max_workers=workers) as executor, tmp_ipa_path.open('wb') as tmp_ipa_file:
+        writer = IPAWriter(tmp_ipa_file)
+        # Keep a bounded window of compressed files in memory and write them in their original order
+        pending: deque[Future[IPAEntry]] = deque()
+
+        def write_next():
+            nonlocal reused
+            entry = pending.popleft().result()
+            writer.write(entry)
+            if entry.sha256:
+                manifest.entries[entry.arcname] = entry.sha256
+            if entry.reused:
+                reused += 1
 
-        spinner.ok("🟢")
-        print(f'Successfully created {ipa_path}')
+        for file_path in sorted(app_path.rglob('*')):
+            file_zip_path = Path.joinpath(Path('Payload'), file_path.relative_to(app_path.parent)).as_posix()
+
+            if file_path.is_dir():
+                # Directories have no content, but must keep their position in the archive
+                directory_entry: Future[IPAEntry] = Future()
+                directory_entry.set_result(IPAEntry(
+                    arcname=file_zip_path + '/', sha256='', crc=0, file_size=0,
+                    compress_type=zipfile.ZIP_STORED, data=b'',
+                    external_attr=((file_path.stat().st_mode & 0xFFFF) << 16) | 0x10
+                ))
+                pending.append(directory_entry)
+            else:
+                store = store_compressed and file_path.suffix.lower() in COMPRESSED_SUFFIXES
+                pending.append(executor.submit(
+                    compress_file, file_path, file_zip_path, compresslevel, store,
+                    previous.ipa_path if previous else None, previous_infos.get(file_zip_path),
+                    previous.entries.get(file_zip_path) if previous else None
+                ))
+
+            if len(pending) >= workers * 4:
+                write_next()
+
+        while pending:
+            write_next()
+        writer.close()
+
+    tmp_ipa_path.replace(ipa_path)
+    manifest.save(manifest_path)
+
+    return reused
 
 
 def airdrop(ipa_path: Path):
@@ -135,15 +583,95 @@ def main():
         '-airdrop', action='store_true',
         help='Open the AirDrop UI to send the final .tipa file to your phone.'
     )
+    arg_parser.add_argument(
+        '-store-compressed', action='store_true',
+        help='Store already compressed assets (images, asset catalogs, archives) without deflating them again.'
+    )
+    arg_parser.add_argument(
+        '-compresslevel', type=int, default=6, choices=range(0, 10), metavar='[0-9]',
+        help='The deflate compression level for files in the IPA (default: 6).'
+    )
+    arg_parser.add_argument(
+        '-jobs', type=int, default=None,
+        help='The number of threads compressing files for the IPA (default: number of CPUs).'
+    )
+    arg_parser.add_argument(
+        '-dry-run', '--dry-run', action='store_true',
+        help='Only print which build stages would run without executing them.'
+    )
     args = arg_parser.parse_args()
 
-    version, build = get_build_settings()
-    build_rust_src()
-    archive_path = build_archive()
-    sign_executable(archive_path)
     ipa_extension = '.tipa' if args.tipa else '.ipa'
-    ipa_path = Path('build', f'CellGuard-{version}-{build}{ipa_extension}')
-    create_ipa(archive_path, ipa_path)
+
+    def get_ipa_path(results: dict[str, Any]) -> Path:
+        version, build = results['settings']
+        return Path('build', f'CellGuard-{version}-{build}{ipa_extension}')
+
+    def get_bundle_path(results: dict[str, Any]) -> Path:
+        return get_app_path(Path(results['archive']))
+
+    # The build settings and the Rust libraries are independent of each other, so they are built concurrently.
+    # xcodebuild archive is incremental on its own, so it always runs.
+    stages = [
+        Stage(
+            name='settings', text='Getting Build Settings...',
+            run=lambda results, log: list(get_build_settings(log)),
+            fingerprint=lambda results: fingerprint([
+                PROJECT_DIR.joinpath('CellGuard.xcodeproj', 'project.pbxproj'), PROJECT_DIR.joinpath('Config')
+            ]),
+        ),
+        Stage(
+            name='rust', text='Building Native Libraries...',
+            run=lambda results, log: build_rust_src(log),
+            fingerprint=lambda results: fingerprint([
+                PROJECT_DIR.joinpath('build-rust.sh'), RUST_DIR.joinpath('Cargo.toml'), RUST_DIR.joinpath('Cargo.lock'),
+                RUST_DIR.joinpath('build.rs'), RUST_DIR.joinpath('src')
+            ]),
+            outputs=lambda results: [
+                RUST_DIR.joinpath('target', 'universal', 'release', 'libcellguard.a'),
+                GENERATED_DIR.joinpath('SwiftBridgeCore.swift'),
+                GENERATED_DIR.joinpath('SwiftBridgeCore.h'),
+                GENERATED_DIR.joinpath('cellguard', 'cellguard.swift'),
+                GENERATED_DIR.joinpath('cellguard', 'cellguard.h'),
+            ],
+        ),
+        Stage(
+            name='archive', text='Building CellGuard...',
+            run=lambda results, log: str(build_archive(log)),
+            dependencies=['rust'],
+        ),
+        Stage(
+            name='sign', text='Signing executable...',
+            run=lambda results, log: sign_executable(Path(results['archive']), log),
+            dependencies=['archive'],
+            fingerprint=lambda results: fingerprint([get_bundle_path(results)]),
+            outputs=lambda results: [get_bundle_path(results)],
+        ),
+        Stage(
+            name='ipa', text='Creating IPA file...',
+            run=lambda results, log: create_ipa(
+                Path(results['archive']), get_ipa_path(results), args.compresslevel, args.store_compressed, args.jobs
+            ),
+            dependencies=['settings', 'sign'],
+            fingerprint=lambda results: fingerprint(
+                [get_bundle_path(results)], f'{get_ipa_path(results)} {args.compresslevel} {args.store_compressed}'
+            ),
+            outputs=lambda results: [get_ipa_path(results)],
+        ),
+    ]
+    build_dir = PROJECT_DIR.joinpath('build')
+    runner = StageRunner(stages, build_dir.joinpath('build-stages.json'), build_dir.joinpath('logs'))
+
+    if args.dry_run:
+        print('Build Stages (dry run):')
+        runner.dry_run()
+        return
+
+    results = runner.run()
+    runner.print_report()
+
+    ipa_path = get_ipa_path(results)
+    print(f'Successfully created {ipa_path}')
 
     if args.airdrop:
         if args.tipa:
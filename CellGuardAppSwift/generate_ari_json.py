@@ -1,10 +1,15 @@
+import argparse
+import hashlib
 import json
+import re
 import sys
+import time
 from pathlib import Path
-from typing import Optional
+from typing import Any, Iterator, Optional
 
 from luaparser import ast
-from luaparser.astnodes import Return, Statement, Table, Number, String, Field, Name, Expression
+from luaparser.astnodes import Return, Statement, Table, Number, String, Name, Expression, TrueExpr, FalseExpr, \
+    UMinusOp
 from yaspin import yaspin
 
 
@@ -12,6 +17,184 @@ from yaspin import yaspin
 # - https://github.com/seemoo-lab/aristoteles/blob/master/tools/ghidra_scripts/ari-structure-extractor.py
 # - https://github.com/seemoo-lab/aristoteles/blob/master/types/structure/libari_dylib.lua
 
+class LuaSyntaxError(ValueError):
+    """ Raised by the LuaTableParser if the input is not part of the supported Lua subset. """
+    pass
+
+
+class LuaTableParser:
+    """
+    A streaming parser for Lua files which only consist of a single 'return' statement with a table constructor,
+    like the libari_dylib.lua file of aristoteles.
+
+    Instead of building a full syntax tree like luaparser, it directly converts the tokens into Python values.
+    Tables become dictionaries whose keys follow Lua's semantics (positional fields are numbered from 1),
+    strings become str, numbers become int or float, and booleans become bool.
+    """
+
+    # https://www.lua.org/manual/5.4/manual.html#3.1
+    TOKEN_PATTERN = re.compile(r'''
+          (?P<space>\s+)
+        | (?P<comment>--(?:\[(?P<comment_eq>=*)\[.*?\](?P=comment_eq)\]|[^\n]*))
+        | (?P<long_string>\[(?P<string_eq>=*)\[.*?\](?P=string_eq)\])
+        | (?P<string>"(?:[^"\\\n]|\\.)*"|'(?:[^'\\\n]|\\.)*')
+        | (?P<number>0[xX][0-9a-fA-F]+|(?:[0-9]+\.?[0-9]*|\.[0-9]+)(?:[eE][+-]?[0-9]+)?)
+        | (?P<name>[A-Za-z_][A-Za-z0-9_]*)
+        | (?P<symbol>[{}\[\]=,;-])
+        | (?P<error>.)
+    ''', re.VERBOSE | re.DOTALL | re.ASCII)
+
+    ESCAPE_PATTERN = re.compile(r'\\(?:([abfnrtv\\"\'\n])|([0-9]{1,3})|x([0-9a-fA-F]{2})|z\s*|u\{([0-9a-fA-F]+)\})')
+    ESCAPE_CHARACTERS = {
+        'a': '\a', 'b': '\b', 'f': '\f', 'n': '\n', 'r': '\r', 't': '\t', 'v': '\v',
+        '\\': '\\', '"': '"', '\'': '\'', '\n': '\n'
+    }
+    CONSTANTS = {'true': True, 'false': False, 'nil': None}
+
+    text: str
+    tokens: Iterator[re.Match]
+    kind: Optional[str]
+    value: str
+    position: int
+
+    def __init__(self, text: str) -> None:
+        self.text = text
+        self.tokens = self.TOKEN_PATTERN.finditer(text)
+        self.kind = None
+        self.value = ''
+        self.position = 0
+
+    @staticmethod
+    def parse(text: str) -> Any:
+        """ Parse the text of a Lua file and return the value of its return statement. """
+        parser = LuaTableParser(text)
+        parser.advance()
+        if parser.kind != 'name' or parser.value != 'return':
+            parser.fail('The first statement of the lua file is not a return statement')
+        parser.advance()
+
+        value = parser.parse_value()
+        if parser.kind == 'symbol' and parser.value == ';':
+            parser.advance()
+        if parser.kind is not None:
+            parser.fail(f'Unexpected token {parser.value!r} after the return statement')
+
+        return value
+
+    def fail(self, message: str):
+        line = self.text.count('\n', 0, self.position) + 1
+        raise LuaSyntaxError(f'{message} (line {line})')
+
+    def advance(self) -> None:
+        """ Move to the next token, skipping whitespace and comments. """
+        for match in self.tokens:
+            kind = match.lastgroup
+            if kind == 'space' or kind == 'comment':
+                continue
+            self.kind = kind
+            self.value = match.group()
+            self.position = match.start()
+            if kind == 'error':
+                self.fail(f'Unsupported character {self.value!r}')
+            return
+
+        self.kind = None
+        self.value = ''
+        self.position = len(self.text)
+
+    def expect_symbol(self, symbol: str) -> None:
+        if self.kind != 'symbol' or self.value != symbol:
+            self.fail(f'Expected {symbol!r} but got {self.value!r}')
+        self.advance()
+
+    def parse_value(self) -> Any:
+        kind = self.kind
+        value = self.value
+
+        if kind == 'symbol':
+            if value == '{':
+                return self.parse_table()
+            if value == '-':
+                self.advance()
+                if self.kind != 'number':
+                    self.fail('Only numbers can be negated')
+                return -self.parse_value()
+        elif kind == 'string':
+            self.advance()
+            return self.unescape(value[1:-1])
+        elif kind == 'long_string':
+            self.advance()
+            content = value[value.index('[', 1) + 1:value.rindex(']', 0, -1)]
+            # A newline directly following the opening long bracket is not part of the string
+            return content[1:] if content.startswith('\n') else content
+        elif kind == 'number':
+            self.advance()
+            if value[:2] in ('0x', '0X'):
+                return int(value, 16)
+            if '.' in value or 'e' in value or 'E' in value:
+                return float(value)
+            return int(value)
+        elif kind == 'name' and value in self.CONSTANTS:
+            self.advance()
+            return self.CONSTANTS[value]
+
+        self.fail(f'Unsupported expression {value!r}')
+
+    def parse_table(self) -> dict[Any, Any]:
+        self.expect_symbol('{')
+
+        table: dict[Any, Any] = {}
+        next_index = 1
+
+        while self.kind != 'symbol' or self.value != '}':
+            if self.kind == 'symbol' and self.value == '[':
+                # [key] = value
+                self.advance()
+                key = self.parse_value()
+                self.expect_symbol(']')
+                self.expect_symbol('=')
+                table[key] = self.parse_value()
+            elif self.kind == 'name' and self.value not in self.CONSTANTS:
+                # name = value
+                key = self.value
+                self.advance()
+                self.expect_symbol('=')
+                table[key] = self.parse_value()
+            else:
+                # Positional value
+                table[next_index] = self.parse_value()
+                next_index += 1
+
+            if self.kind == 'symbol' and self.value in (',', ';'):
+                self.advance()
+            elif self.kind != 'symbol' or self.value != '}':
+                self.fail(f'Expected \',\' or \'}}\' but got {self.value!r}')
+
+        self.advance()
+        return table
+
+    @staticmethod
+    def unescape(string: str) -> str:
+        if '\\' not in string:
+            return string
+
+        def replace(match: re.Match) -> str:
+            character, decimal, hexadecimal, codepoint = match.groups()
+            if character is not None:
+                return LuaTableParser.ESCAPE_CHARACTERS[character]
+            elif decimal is not None:
+                return chr(int(decimal))
+            elif hexadecimal is not None:
+                return chr(int(hexadecimal, 16))
+            elif codepoint is not None:
+                return chr(int(codepoint, 16))
+            else:
+                # \z skips the following whitespace
+                return ''
+
+        return LuaTableParser.ESCAPE_PATTERN.sub(replace, string)
+
+
 class ARIAppDefinitions:
     """
     A class used to generate the ARI definition files used by the CellGuard app
@@ -20,55 +203,69 @@ class ARIAppDefinitions:
 
     data_file_path: Path
     build_file_path: Path
+    index_file_path: Path
+    cache_file_path: Path
 
-    def __init__(self, data_file: Path, build_file: Path) -> None:
+    def __init__(self, data_file: Path, build_file: Path, index_file: Path, cache_file: Path) -> None:
         self.data_file_path = data_file
         self.build_file_path = build_file
+        self.index_file_path = index_file
+        self.cache_file_path = cache_file
 
     @staticmethod
-    def map_lua_table(table_field: Table) -> dict[int | str, Expression]:
-        d: dict[int | str, Expression] = {}
-
-        for field in table_field.fields:
-            if isinstance(field.key, Name):
-                d[field.key.id] = field.value
-            elif isinstance(field.key, String):
-                d[field.key.s] = field.value
-            elif isinstance(field.key, Number):
-                d[field.key.n] = field.value
-
-        return d
+    def map_lua_value(expression: Expression) -> Any:
+        """ Convert a luaparser expression into the Python values also returned by the LuaTableParser. """
+        if isinstance(expression, Table):
+            d: dict[Any, Any] = {}
+
+            for field in expression.fields:
+                if isinstance(field.key, Name):
+                    d[field.key.id] = ARIAppDefinitions.map_lua_value(field.value)
+                elif isinstance(field.key, String):
+                    d[field.key.s] = ARIAppDefinitions.map_lua_value(field.value)
+                elif isinstance(field.key, Number):
+                    d[field.key.n] = ARIAppDefinitions.map_lua_value(field.value)
+
+            return d
+        elif isinstance(expression, String):
+            return expression.s
+        elif isinstance(expression, Number):
+            return expression.n
+        elif isinstance(expression, TrueExpr):
+            return True
+        elif isinstance(expression, FalseExpr):
+            return False
+        elif isinstance(expression, UMinusOp) and isinstance(expression.operand, Number):
+            return -expression.operand.n
+        else:
+            return None
 
     @staticmethod
-    def process_type(type_field: Field, group_id: int) -> Optional[dict]:
-        if not isinstance(type_field.key, Number) or not isinstance(type_field.value, Table):
-            print(f'Skipping type {type_field.key} of group {group_id} because its malformed')
+    def process_type(type_id: Any, type_map: Any, group_id: int) -> Optional[dict]:
+        if not isinstance(type_id, int) or not isinstance(type_map, dict):
+            print(f'Skipping type {type_id} of group {group_id} because its malformed')
             return None
 
-        # Get the id from the
-        type_id = type_field.key.n
-
-        # Create a Python dictionary of the upper type table
-        type_map = ARIAppDefinitions.map_lua_table(type_field.value)
-
         # Check if the type name is present there, if not abort
         if 'name' not in type_map:
             print(f'Skipping type {type_id} of group {group_id} because we couldn\'t extract the type\'s name')
             return None
-        type_name = type_map['name'].s
+        type_name = type_map['name']
 
         # Compile a list of TLV dictionary for the JSON output
-        tlvs_field: Table = type_map['tlvs']
+        tlvs_table: dict = type_map['tlvs']
         tlvs: list[dict] = []
 
-        for tlv_id, tlv_data_table in ARIAppDefinitions.map_lua_table(tlvs_field).items():
-            tlv_data = ARIAppDefinitions.map_lua_table(tlv_data_table)
-            tlv_codec = ARIAppDefinitions.map_lua_table(tlv_data['codec'])
+        for tlv_id, tlv_data in tlvs_table.items():
+            if not isinstance(tlv_id, int) or not isinstance(tlv_data, dict):
+                print(f'Skipping TLV {tlv_id} of type {type_id} in group {group_id} because its malformed')
+                continue
+            tlv_codec = tlv_data['codec']
             tlvs.append({
                 'identifier': tlv_id,
-                'name': tlv_data['type_desc'].s,
-                'codecLength': tlv_codec['length'].n,
-                'codecName': tlv_codec['name'].s
+                'name': tlv_data['type_desc'],
+                'codecLength': tlv_codec['length'],
+                'codecName': tlv_codec['name']
             })
 
         return {
@@ -78,33 +275,26 @@ class ARIAppDefinitions:
         }
 
     @staticmethod
-    def process_group(group_field: Field) -> Optional[dict]:
-        if not isinstance(group_field.key, Number) or not isinstance(group_field.value, Table):
-            print(f'Skipping group {group_field} as it does not have a number as key or a table as body')
+    def process_group(group_id: Any, group_map: Any) -> Optional[dict]:
+        if not isinstance(group_id, int) or not isinstance(group_map, dict):
+            print(f'Skipping group {group_id} as it does not have a number as key or a table as body')
             return None
 
-        key: Number = group_field.key
-        value: Table = group_field.value
-
-        # Get the group id from the key
-        group_id = key.n
-
         group_name: Optional[str] = None
         types: list[dict] = []
 
         # Iterate through the key-value pairs in the table
-        for type_field in value.fields:
-            if isinstance(type_field.key, String) and isinstance(type_field.value, String) \
-                    and type_field.key.s == 'name':
+        for type_key, type_value in group_map.items():
+            if type_key == 'name' and isinstance(type_value, str):
                 # We've found the name entry
-                group_name = type_field.value.s
-            elif isinstance(type_field.key, Number) and isinstance(type_field.value, Table):
+                group_name = type_value
+            elif isinstance(type_key, int) and isinstance(type_value, dict):
                 # Try to extract the type information
-                type_dict = ARIAppDefinitions.process_type(type_field, group_id)
+                type_dict = ARIAppDefinitions.process_type(type_key, type_value, group_id)
                 if type_dict:
                     types.append(type_dict)
             else:
-                print(f'Skipping type field {type_field} of group {group_id} because its malformed')
+                print(f'Skipping type field {type_key} of group {group_id} because its malformed')
 
         if not group_name:
             print(f'Couldn\'t extract name for group {group_id}')
@@ -117,30 +307,189 @@ class ARIAppDefinitions:
             'types': types,
         }
 
-    def generate(self) -> bool:
-        """ Generate a JSON definition file based on the class properties and return its location. """
-        # Parse the libari_dylib.lua file, this may take some time
-        with yaspin(text=f"Reading {self.data_file_path.name}..."):
-            with open(self.data_file_path, "r") as data_file:
-                tree = ast.parse(data_file.read())
+    @staticmethod
+    def read_luaparser(data: str) -> Optional[dict]:
+        """ Parse the Lua file with luaparser which builds a full syntax tree, this may take some time. """
+        try:
+            tree = ast.parse(data)
+        except ast.SyntaxException as e:
+            print(f'Failed to parse the lua file: {e}')
+            return None
 
         # Check that it has only a return statement
         first_statement: Statement = tree.body.body[0]
         if not isinstance(first_statement, Return):
             print('The first statement of the lua file is not a return statement.')
-            return False
+            return None
 
         # Get the handle of the root table in the file
         return_statement: Return = first_statement
-        group_table: Table = return_statement.values[0]
+        return ARIAppDefinitions.map_lua_value(return_statement.values[0])
+
+    @staticmethod
+    def read_streaming(data: str) -> Optional[dict]:
+        """ Parse the Lua file with the LuaTableParser which only supports a small subset of Lua. """
+        try:
+            return LuaTableParser.parse(data)
+        except LuaSyntaxError as e:
+            print(f'Failed to parse the lua file: {e}')
+            return None
+
+    @staticmethod
+    def collect_groups(group_table: dict) -> list[dict]:
         json_group_list: list[dict] = []
 
         # Collect all group and type data
-        for group_field in group_table.fields:
-            group_data = self.process_group(group_field)
+        for group_id, group_map in group_table.items():
+            group_data = ARIAppDefinitions.process_group(group_id, group_map)
             if group_data:
                 json_group_list.append(group_data)
 
+        return json_group_list
+
+    @staticmethod
+    def build_index(json_group_list: list[dict]) -> dict:
+        """
+        Convert the list of groups into a nested dictionary keyed by the group, type, and TLV identifiers.
+        Each TLV is stored as a [name, codecLength, codecIndex] array referencing the shared codec name table.
+        """
+        codecs: list[str] = []
+        codec_indices: dict[str, int] = {}
+        groups: dict[str, dict] = {}
+
+        for group in json_group_list:
+            types: dict[str, dict] = {}
+            for type_dict in group['types']:
+                tlvs: dict[str, list] = {}
+                for tlv in type_dict['tlvs']:
+                    codec_index = codec_indices.get(tlv['codecName'])
+                    if codec_index is None:
+                        codec_index = len(codecs)
+                        codec_indices[tlv['codecName']] = codec_index
+                        codecs.append(tlv['codecName'])
+                    tlvs[str(tlv['identifier'])] = [tlv['name'], tlv['codecLength'], codec_index]
+                types[str(type_dict['identifier'])] = {'name': type_dict['name'], 'tlvs': tlvs}
+            groups[str(group['identifier'])] = {'name': group['name'], 'types': types}
+
+        return {'codecs': codecs, 'groups': groups}
+
+    @staticmethod
+    def expand_index(index: dict) -> list[dict]:
+        """ Convert the indexed format back into the list of groups. """
+        codecs: list[str] = index['codecs']
+
+        return [{
+            'identifier': int(group_id),
+            'name': group['name'],
+            'types': [{
+                'identifier': int(type_id),
+                'name': type_dict['name'],
+                'tlvs': [{
+                    'identifier': int(tlv_id),
+                    'name': name,
+                    'codecLength': codec_length,
+                    'codecName': codecs[codec_index]
+                } for tlv_id, (name, codec_length, codec_index) in type_dict['tlvs'].items()]
+            } for type_id, type_dict in group['types'].items()]
+        } for group_id, group in index['groups'].items()]
+
+    @staticmethod
+    def resolve(index: dict, group_id: int, type_id: int, tlv_id: int) -> Optional[dict]:
+        """ Look up a single TLV in the indexed format without walking the whole document. """
+        group = index['groups'].get(str(group_id))
+        if group is None:
+            return None
+        type_dict = group['types'].get(str(type_id))
+        if type_dict is None:
+            return None
+        tlv = type_dict['tlvs'].get(str(tlv_id))
+        if tlv is None:
+            return None
+
+        name, codec_length, codec_index = tlv
+        return {
+            'identifier': tlv_id,
+            'name': name,
+            'codecLength': codec_length,
+            'codecName': index['codecs'][codec_index]
+        }
+
+    def output_hashes(self) -> dict[str, str]:
+        return {
+            path.name: hashlib.sha256(path.read_bytes()).hexdigest()
+            for path in [self.build_file_path, self.index_file_path]
+        }
+
+    def fingerprint(self, data: bytes) -> str:
+        """ Hash the input file together with this script, so changes to the generator also invalidate the cache. """
+        sha = hashlib.sha256()
+        sha.update(data)
+        sha.update(Path(__file__).read_bytes())
+        return sha.hexdigest()
+
+    def is_cached(self, fingerprint: str) -> bool:
+        if not self.cache_file_path.is_file() or not self.build_file_path.is_file() \
+                or not self.index_file_path.is_file():
+            return False
+
+        with open(self.cache_file_path, "r") as cache_file:
+            try:
+                cache = json.load(cache_file)
+            except json.JSONDecodeError:
+                return False
+
+        if not isinstance(cache, dict) or cache.get('input') != fingerprint:
+            return False
+
+        # Make sure that nobody modified the output files in the meantime
+        return cache.get('output') == self.output_hashes()
+
+    def write_cache(self, fingerprint: str) -> None:
+        if not self.cache_file_path.parent.exists():
+            self.cache_file_path.parent.mkdir(parents=True)
+
+        with open(self.cache_file_path, "w") as cache_file:
+            json.dump({
+                'input': fingerprint,
+                'output': self.output_hashes(),
+            }, cache_file)
+
+    def generate(self, force: bool = False, luaparser: bool = False) -> bool:
+        """ Generate a JSON definition file based on the class properties and return its location. """
+        data = self.data_file_path.read_bytes()
+        fingerprint = self.fingerprint(data)
+
+        if not force and self.is_cached(fingerprint):
+            print(f'{self.build_file_path.name} is up-to-date with {self.data_file_path.name}')
+            return True
+
+        with yaspin(text=f"Reading {self.data_file_path.name}..."):
+            if luaparser:
+                group_table = self.read_luaparser(data.decode('utf-8'))
+            else:
+                group_table = self.read_streaming(data.decode('utf-8'))
+
+        if not isinstance(group_table, dict):
+            print('The lua file does not return a table.')
+            return False
+
+        json_group_list = self.collect_groups(group_table)
+
+        # Verify that the indexed format contains exactly the same information
+        index = json.loads(json.dumps(self.build_index(json_group_list)))
+        if self.expand_index(index) != json_group_list:
+            print('The indexed ARI definitions do not match the list of ARI groups.')
+            return False
+
+        # Verify that every TLV can be looked up directly in the indexed format
+        for group in json_group_list:
+            for type_dict in group['types']:
+                for tlv in type_dict['tlvs']:
+                    if self.resolve(index, group['identifier'], type_dict['identifier'], tlv['identifier']) != tlv:
+                        print(f'Cannot resolve TLV {tlv["identifier"]} of type {type_dict["identifier"]} '
+                              f'in group {group["identifier"]} in the indexed ARI definitions.')
+                        return False
+
         # Create the directory if not does not yet exist
         if not self.build_file_path.parent.exists():
             print('Remember to include the created in the XCode project')
@@ -149,32 +498,90 @@ class ARIAppDefinitions:
         # Write the data
         with open(self.build_file_path, "w") as output_file:
             json.dump(json_group_list, output_file)
+        with open(self.index_file_path, "w") as output_file:
+            json.dump(index, output_file, separators=(',', ':'))
+
+        self.write_cache(fingerprint)
 
         print(f'Collected {len(json_group_list)} ARI groups')
 
         return True
 
+    def benchmark(self, rounds: int) -> bool:
+        """ Compare the time both parsers require for the libari_dylib.lua file and check that their output matches. """
+        data = self.data_file_path.read_text('utf-8')
+        results: dict[str, list[dict]] = {}
+
+        for name, read in [('luaparser', self.read_luaparser), ('streaming', self.read_streaming)]:
+            durations: list[float] = []
+            with yaspin(text=f"Benchmarking {name}...") as spinner:
+                for _ in range(rounds):
+                    start = time.perf_counter()
+                    group_table = read(data)
+                    if not isinstance(group_table, dict):
+                        spinner.fail("🔴")
+                        print(f'The lua file does not return a table when parsed with {name}.')
+                        return False
+                    results[name] = self.collect_groups(group_table)
+                    durations.append(time.perf_counter() - start)
+                spinner.ok("🟢")
+            print(f'  {name}: min {min(durations):.3f}s, mean {sum(durations) / len(durations):.3f}s')
+
+        if results['luaparser'] != results['streaming']:
+            print('The output of both parsers differs!')
+            return False
+
+        print(f'Both parsers collected the same {len(results["streaming"])} ARI groups')
+        return True
+
 
 def main():
     """ The main function composing all the work. """
-    if len(sys.argv) != 2:
-        sys.stderr.write("Please clone the aristoteles repository from "
-                         "https://github.com/seemoo-lab/aristoteles/tree/master and run this script again.\n")
-        sys.stderr.write("Usage: generate_ari_json.py <path/libari_dylib.lua>\n")
-        sys.exit(1)
-
-    data_file = Path(sys.argv[1])
+    arg_parser = argparse.ArgumentParser(
+        prog='generate_ari_json.py',
+        description='Generate the ARI definitions JSON file for CellGuard from libari_dylib.lua.',
+        epilog='Please clone the aristoteles repository from '
+               'https://github.com/seemoo-lab/aristoteles/tree/master to obtain the libari_dylib.lua file.'
+    )
+    arg_parser.add_argument('data_file', type=Path, help='Path to aristoteles/types/structure/libari_dylib.lua')
+    arg_parser.add_argument(
+        '-f', '--force', action='store_true',
+        help='Regenerate the JSON file even if libari_dylib.lua has not changed since the last run.'
+    )
+    arg_parser.add_argument(
+        '--luaparser', action='store_true',
+        help='Parse libari_dylib.lua with the (slower) luaparser library instead of the streaming parser.'
+    )
+    arg_parser.add_argument(
+        '--benchmark', type=int, metavar='ROUNDS', nargs='?', const=3,
+        help='Compare the runtime and output of both parsers without writing the JSON file.'
+    )
+    args = arg_parser.parse_args()
+
+    data_file: Path = args.data_file
     # Directly update the file present in the XCode project
     build_file = Path("CellGuard", "Tweaks", "Capture Packets", "ari-definitions.json")
+    index_file = Path("CellGuard", "Tweaks", "Capture Packets", "ari-definitions-indexed.json")
+    cache_file = Path("build", "ari-definitions.cache.json")
 
     if not data_file.is_file() or data_file.name != 'libari_dylib.lua':
         sys.stderr.write("Specified libari_dylib.lua has the wrong name or is not a file!\n")
         sys.exit(1)
 
-    definitions = ARIAppDefinitions(data_file, build_file)
-    definitions.generate()
+    definitions = ARIAppDefinitions(data_file, build_file, index_file, cache_file)
+
+    if args.benchmark is not None:
+        if args.benchmark < 1:
+            sys.stderr.write("The number of benchmark rounds must be at least 1!\n")
+            sys.exit(1)
+        if not definitions.benchmark(args.benchmark):
+            sys.exit(1)
+        return
+
+    if not definitions.generate(force=args.force, luaparser=args.luaparser):
+        sys.exit(1)
 
-    print(f"Successfully generated CellGuard JSON definition file {build_file.name}")
+    print(f"Successfully generated CellGuard JSON definition files {build_file.name} and {index_file.name}")
 
 
 if __name__ == "__main__":